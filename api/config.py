@@ -2,13 +2,35 @@
 Uygulama konfigürasyonu ve Supabase bağlantısı
 """
 import os
-from typing import Optional, List
+from functools import lru_cache
+from typing import Optional, List, Iterator, AsyncIterator, Set, Tuple, Dict
+from datetime import datetime, date
+from urllib.parse import quote
 from dotenv import load_dotenv
 from supabase import create_client, Client
+from supabase.lib.client_options import ClientOptions
+from postgrest.types import ReturnMethod
+from resilience import ResilientCaller, CircuitBreaker, ServiceUnavailableError
 
 # .env dosyasını yükle
 load_dotenv()
 
+# PostgREST'e giden GET isteklerinde filtre parametreleri için URL boyutu bütçesi
+# (proxy ve sunucuların ~8KB istek satırı sınırının altında kalır)
+MAX_FILTER_URL_LENGTH = 6000
+
+
+@lru_cache(maxsize=None)
+def available_image_formats() -> Set[str]:
+    """Pillow kurulumunda kodlayıcısı bulunan çıktı formatları (bir kez kontrol edilir)"""
+    from PIL import Image
+    try:
+        import pillow_avif  # noqa: F401 - opsiyonel AVIF kodlayıcı eklentisi
+    except ImportError:
+        pass
+    Image.init()
+    return {fmt for fmt, pil_format in (("jpeg", "JPEG"), ("webp", "WEBP"), ("avif", "AVIF")) if pil_format in Image.SAVE}
+
 
 class Settings:
     """Uygulama ayarları"""
@@ -27,6 +49,23 @@ class Settings:
         self.max_file_size = int(os.getenv("MAX_FILE_SIZE", str(20 * 1024 * 1024)))  # 20MB
         self.allowed_extensions = ["jpg", "jpeg", "png"]
         self.allowed_mime_types = ["image/jpeg", "image/png"]
+
+        # Görüntü kodlama ayarları
+        self.image_output_format = os.getenv("IMAGE_OUTPUT_FORMAT", "jpeg").lower()  # jpeg, webp, avif
+        self.image_max_width = int(os.getenv("IMAGE_MAX_WIDTH", "1920"))
+        self.image_quality = int(os.getenv("IMAGE_QUALITY", "85"))
+        self.image_min_quality = int(os.getenv("IMAGE_MIN_QUALITY", "60"))
+        self.image_target_bytes = int(os.getenv("IMAGE_TARGET_BYTES", "0"))  # 0 = hedef boyut araması kapalı
+        # Progressive JPEG ~%3-5 daha küçük ama kodlaması daha fazla CPU harcar
+        self.image_progressive = os.getenv("IMAGE_PROGRESSIVE", "false").lower() == "true"
+
+        # Depolama backend'i: supabase veya local (yerel disk)
+        self.storage_backend = os.getenv("STORAGE_BACKEND", "supabase").lower()
+        self.local_storage_path = os.getenv("LOCAL_STORAGE_PATH", "./storage")
+        self.local_storage_base_url = os.getenv("LOCAL_STORAGE_BASE_URL", "/api/files")
+        # Supabase public bucket davranışı: imzasız URL'ler de sunulur. Kayıtlara
+        # imzasız URL yazıldığı için false şu an desteklenmez (validate() reddeder)
+        self.local_storage_public = os.getenv("LOCAL_STORAGE_PUBLIC", "true").lower() == "true"
         
         # Storage bucket isimleri
         self.kyc_documents_bucket = os.getenv("KYC_DOCUMENTS_BUCKET", "kyc-documents")
@@ -35,6 +74,8 @@ class Settings:
         # Sayfalama ayarları
         self.default_page_size = int(os.getenv("DEFAULT_PAGE_SIZE", "10"))
         self.max_page_size = int(os.getenv("MAX_PAGE_SIZE", "100"))
+        self.export_batch_size = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+        self.import_batch_size = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
         
         # CORS ayarları
         cors_origins_str = os.getenv("CORS_ORIGINS", "http://localhost:3000,http://127.0.0.1:3000")
@@ -43,6 +84,25 @@ class Settings:
         # Rate limiting
         self.rate_limit_requests = int(os.getenv("RATE_LIMIT_REQUESTS", "10"))
         self.rate_limit_window = int(os.getenv("RATE_LIMIT_WINDOW", "60"))
+        
+        # Dayanıklılık: deneme başına timeout, toplam süre bütçesi, retry ve circuit breaker
+        self.db_timeout = float(os.getenv("DB_TIMEOUT", "3"))
+        self.db_deadline = float(os.getenv("DB_DEADLINE", "8"))
+        self.storage_timeout = float(os.getenv("STORAGE_TIMEOUT", "10"))
+        self.storage_deadline = float(os.getenv("STORAGE_DEADLINE", "20"))
+        self.retry_attempts = int(os.getenv("RETRY_ATTEMPTS", "2"))  # idempotent çağrılarda ek deneme sayısı
+        self.retry_backoff = float(os.getenv("RETRY_BACKOFF", "0.2"))
+        self.hedge_delay = float(os.getenv("HEDGE_DELAY", "0"))  # 0 = kapalı; örn. 0.3 ile okumalarda ikinci istek
+        self.breaker_failure_threshold = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+        self.breaker_reset_timeout = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
+        
+        # Yük testi için storage fault injection (üretimde 0 bırakın)
+        self.storage_fault_error_rate = float(os.getenv("STORAGE_FAULT_ERROR_RATE", "0"))
+        self.storage_fault_latency = float(os.getenv("STORAGE_FAULT_LATENCY", "0"))
+        self.storage_fault_stall_rate = float(os.getenv("STORAGE_FAULT_STALL_RATE", "0"))
+        
+        # İstatistik önbelleği (diğer instance'lardaki değişiklikler bu süre sonunda yansır)
+        self.stats_cache_ttl = int(os.getenv("STATS_CACHE_TTL", "30"))
     
     def validate(self) -> List[str]:
         """Konfigürasyon validasyonu"""
@@ -58,7 +118,20 @@ class Settings:
             
         if not self.supabase_anon_key:
             errors.append("SUPABASE_ANON_KEY environment variable gerekli")
-        
+
+        if self.storage_backend not in ("supabase", "local"):
+            errors.append("STORAGE_BACKEND supabase veya local olmalıdır")
+        elif self.storage_backend == "local" and not self.local_storage_public:
+            errors.append("LOCAL_STORAGE_PUBLIC=false desteklenmiyor: kayıtlara imzasız dosya URL'leri yazılır ve bu URL'ler 403 döner")
+
+        if self.image_output_format not in ("jpeg", "webp", "avif"):
+            errors.append("IMAGE_OUTPUT_FORMAT jpeg, webp veya avif olmalıdır")
+        elif self.image_output_format not in available_image_formats():
+            errors.append(f"IMAGE_OUTPUT_FORMAT={self.image_output_format} için Pillow kodlayıcısı bulunamadı, JPEG kullanılacak")
+
+        if not 1 <= self.image_min_quality <= self.image_quality <= 100:
+            errors.append("IMAGE_MIN_QUALITY <= IMAGE_QUALITY olmalı ve ikisi de 1-100 aralığında olmalıdır")
+
         return errors
 
 
@@ -75,11 +148,56 @@ if config_errors:
     print("📝 env.example dosyasını .env olarak kopyalayıp değerleri doldurun.")
 
 
+def quote_filter_value(value: str) -> str:
+    """PostgREST or=() filtresi için değeri tırnakla (virgül/parantez güvenli)"""
+    escaped = value.replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def add_or_filter(query, conditions: List[str]):
+    """Sorguya or=(...) filtresi ekle
+    
+    postgrest 0.13 select builder'ında or_ metodu olmadığından parametre
+    doğrudan eklenir.
+    """
+    query.params = query.params.add('or', f"({','.join(conditions)})")
+    return query
+
+
+def chunk_by_url_length(values: List[str], max_length: int) -> Iterator[List[str]]:
+    """Değerleri URL kodlanmış toplam uzunluğu max_length'i aşmayan parçalara böl"""
+    chunk: List[str] = []
+    length = 0
+    for value in values:
+        # Tırnaklar ve ayırıcı virgül dahil kodlanmış uzunluk
+        value_length = len(quote(value, safe='')) + 7
+        if chunk and length + value_length > max_length:
+            yield chunk
+            chunk, length = [], 0
+        chunk.append(value)
+        length += value_length
+    if chunk:
+        yield chunk
+
+
 class SupabaseClient:
     """Supabase client wrapper"""
     
     def __init__(self):
         self._client: Optional[Client] = None
+        self.caller = ResilientCaller(
+            "database",
+            timeout=settings.db_timeout,
+            deadline=settings.db_deadline,
+            retries=settings.retry_attempts,
+            backoff=settings.retry_backoff,
+            hedge_delay=settings.hedge_delay,
+            breaker=CircuitBreaker(
+                "database",
+                failure_threshold=settings.breaker_failure_threshold,
+                reset_timeout=settings.breaker_reset_timeout
+            )
+        )
     
     @property
     def client(self) -> Client:
@@ -88,17 +206,31 @@ class SupabaseClient:
             if not settings.supabase_url or not settings.supabase_service_role_key:
                 raise ValueError("Supabase konfigürasyonu eksik. .env dosyasını kontrol edin.")
             
+            # HTTP timeout'ları ResilientCaller timeout'larını aşmamalı; aksi halde
+            # zaman aşımına uğrayan denemeler thread'lerde uzun süre çalışmaya devam eder
             self._client = create_client(
                 settings.supabase_url,
-                settings.supabase_service_role_key
+                settings.supabase_service_role_key,
+                options=ClientOptions(
+                    postgrest_client_timeout=settings.db_timeout,
+                    storage_client_timeout=settings.storage_timeout
+                )
             )
         return self._client
     
+    async def execute(self, query, idempotent: bool = True, hedge: bool = False):
+        """Sorguyu timeout, retry ve circuit breaker ile çalıştır
+        
+        Ekleme gibi idempotent olmayan sorgular tekrar denenmez; hedge yalnızca
+        okuma sorgularında kullanılmalıdır.
+        """
+        return await self.caller.call(query.execute, idempotent=idempotent, hedge=hedge)
+    
     async def health_check(self) -> bool:
         """Supabase bağlantısını kontrol et"""
         try:
             # Basit bir sorgu ile bağlantıyı test et
-            response = self.client.table('verification_requests').select('count').limit(1).execute()
+            await self.execute(self.client.table('verification_requests').select('count').limit(1))
             return True
         except Exception as e:
             print(f"Supabase bağlantı hatası: {e}")
@@ -107,8 +239,14 @@ class SupabaseClient:
     async def check_username_exists(self, username: str) -> bool:
         """Kullanıcı adının var olup olmadığını kontrol et"""
         try:
-            response = self.client.table('verification_requests').select('id').eq('username', username).limit(1).execute()
+            response = await self.execute(
+                self.client.table('verification_requests').select('id').eq('username', username).limit(1),
+                hedge=True
+            )
             return len(response.data) > 0
+        except ServiceUnavailableError:
+            # Veritabanı erişilemezken kontrolü atlama; dosya yüklemeden önce hızlıca başarısız ol
+            raise
         except Exception as e:
             print(f"Username kontrol hatası: {e}")
             return False
@@ -116,11 +254,152 @@ class SupabaseClient:
     async def check_email_exists(self, email: str) -> bool:
         """E-posta adresinin var olup olmadığını kontrol et"""
         try:
-            response = self.client.table('verification_requests').select('id').eq('email', email).limit(1).execute()
+            response = await self.execute(
+                self.client.table('verification_requests').select('id').eq('email', email).limit(1),
+                hedge=True
+            )
             return len(response.data) > 0
+        except ServiceUnavailableError:
+            # Veritabanı erişilemezken kontrolü atlama; dosya yüklemeden önce hızlıca başarısız ol
+            raise
         except Exception as e:
             print(f"Email kontrol hatası: {e}")
             return False
+    
+    async def find_existing_identities(self, usernames: List[str], emails: List[str]) -> Tuple[Set[str], Set[str]]:
+        """Verilen kullanıcı adı ve e-postalardan kayıtlı olanları bul
+        
+        Her sütun için ayrı `in.(...)` sorgusu yapılır; değerler URL uzunluğu
+        sınırını aşmayacak şekilde alt parçalara bölünür.
+        """
+        existing_usernames = await self.find_existing_values('username', usernames)
+        existing_emails = await self.find_existing_values('email', emails)
+        return existing_usernames, existing_emails
+    
+    async def find_existing_values(self, column: str, values: List[str]) -> Set[str]:
+        """Sütunda kayıtlı olan değerleri URL boyutu sınırlı in() sorgularıyla bul"""
+        existing: Set[str] = set()
+        for chunk in chunk_by_url_length(values, MAX_FILTER_URL_LENGTH):
+            response = await self.execute(
+                self.client.table('verification_requests')
+                .select(column)
+                .filter(column, 'in', f"({','.join(quote_filter_value(value) for value in chunk)})"),
+                hedge=True
+            )
+            existing.update(row[column] for row in response.data or [])
+        return existing
+    
+    async def insert_verifications(self, rows: List[dict]) -> int:
+        """Kayıtları tek bir çok satırlı INSERT ile ekle
+        
+        Çok satırlı INSERT atomiktir: hata fırlatılmadıysa tüm satırlar eklenmiştir.
+        returning=minimal ile PostgREST boş gövde döner (postgrest-py bunu
+        count=0 olarak raporlar), bu yüzden yanıttaki sayı kullanılmaz.
+        """
+        if not rows:
+            return 0
+        await self.execute(
+            self.client.table('verification_requests').insert(rows, returning=ReturnMethod.minimal),
+            idempotent=False
+        )
+        return len(rows)
+    
+    async def insert_verification(self, data: dict) -> Optional[dict]:
+        """Tek kayıt ekle (idempotent değil, tekrar denenmez)"""
+        response = await self.execute(
+            self.client.table('verification_requests').insert(data),
+            idempotent=False
+        )
+        return response.data[0] if response.data else None
+    
+    async def get_verification(self, verification_id: str) -> Optional[dict]:
+        """Tek kaydı id ile getir"""
+        response = await self.execute(
+            self.client.table('verification_requests').select('*').eq('id', verification_id),
+            hedge=True
+        )
+        return response.data[0] if response.data else None
+    
+    async def update_verification(self, verification_id: str, payload: dict) -> Optional[dict]:
+        """Kaydı güncelle (aynı değerleri yazdığı için tekrar denenebilir)"""
+        response = await self.execute(
+            self.client.table('verification_requests').update(payload).eq('id', verification_id)
+        )
+        return response.data[0] if response.data else None
+    
+    async def get_status_counts(self) -> Dict[str, int]:
+        """Trigger ile tutulan durum sayaçlarını getir"""
+        response = await self.execute(
+            self.client.table('verification_status_counts').select('status,count'),
+            hedge=True
+        )
+        return {row['status']: row['count'] for row in response.data or []}
+    
+    async def get_daily_stats(self, since: date) -> List[dict]:
+        """Trigger ile tutulan günlük istatistikleri getir"""
+        response = await self.execute(
+            self.client.table('verification_daily_stats').select('*').gte('day', since.isoformat()).order('day'),
+            hedge=True
+        )
+        return response.data or []
+    
+    def verification_query(
+        self,
+        status: Optional[str] = None,
+        search: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        columns: str = '*',
+        count: Optional[str] = None
+    ):
+        """Filtreleri uygulanmış verification_requests sorgusu oluştur"""
+        query = self.client.table('verification_requests').select(columns, count=count)
+        
+        if status:
+            query = query.eq('status', status)
+        
+        if search:
+            # Basit arama (username, email, first_name, last_name)
+            search_term = quote_filter_value(f"%{search}%")
+            query = add_or_filter(query, [
+                f"{column}.ilike.{search_term}"
+                for column in ('username', 'email', 'first_name', 'last_name')
+            ])
+        
+        if date_from:
+            query = query.gte('created_at', date_from.isoformat())
+        
+        if date_to:
+            query = query.lte('created_at', date_to.isoformat())
+        
+        return query
+    
+    async def iter_verification_pages(
+        self,
+        batch_size: int,
+        status: Optional[str] = None,
+        search: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ) -> AsyncIterator[List[dict]]:
+        """Kayıtları keyset sayfalama ile parça parça getir
+        
+        OFFSET yerine son görülen id'den devam edilir; her sayfa primary key
+        index'i üzerinden okunur ve bellekte yalnızca bir sayfa tutulur. Her
+        sayfa okuması timeout, retry ve circuit breaker ile yapılır.
+        """
+        last_id = None
+        while True:
+            query = self.verification_query(status, search, date_from, date_to)
+            if last_id is not None:
+                query = query.gt('id', last_id)
+            response = await self.execute(query.order('id').limit(batch_size), hedge=True)
+            rows = response.data or []
+            if rows:
+                yield rows
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1]['id']
 
 
 # Global Supabase client instance
@@ -0,0 +1,199 @@
+"""
+Toplu doğrulama kaydı içe aktarma (NDJSON)
+"""
+import json
+import uuid
+import asyncio
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+from postgrest.exceptions import APIError
+from pydantic import ValidationError
+from models import VerificationImport, BulkImportError, BulkImportResult
+from config import settings, SupabaseClient
+from resilience import CircuitOpenError, ServiceUnavailableError
+
+# Satıra özgü veritabanı hataları (SQLSTATE sınıfları): 22 veri hatası, 23 bütünlük
+# ihlali (CHECK / UNIQUE). Bu hatalarda parça bölünerek hatalı satırlar bulunur.
+ROW_ERROR_SQLSTATE_CLASSES = ("22", "23")
+
+
+def format_insert_error(error: APIError) -> str:
+    """Tek satırlık INSERT hatasını kullanıcıya gösterilecek mesaja çevir"""
+    if error.code == "23505":
+        return "Bu kullanıcı adı veya e-posta adresi zaten kullanılıyor"
+    return f"Kayıt eklenemedi: {error.message or error.code}"
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Byte parçalarından satır üret (istek gövdesini belleğe almadan)
+
+    Satırlar byte olarak döner; UTF-8 çözümü satır bazında process_chunk'ta
+    yapılır ki hatalı bir satır önceki parçaların sonucunu kaybettirmesin.
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+def format_validation_error(error: ValidationError) -> str:
+    """Pydantic hatasını tek satırlık mesaja çevir"""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}"
+        for item in error.errors()
+    )
+
+
+class VerificationImporter:
+    """NDJSON satırlarını parça parça valide edip toplu ekleyen içe aktarıcı"""
+
+    def __init__(self, supabase: SupabaseClient, batch_size: Optional[int] = None):
+        self.supabase = supabase
+        self.batch_size = batch_size or settings.import_batch_size
+        self.total = 0
+        self.inserted = 0
+        self.errors: List[BulkImportError] = []
+
+    def fail(self, line: int, error: str, username: Optional[str] = None):
+        """Satır hatası kaydet"""
+        self.errors.append(BulkImportError(line=line, username=username, error=error))
+
+    async def process_chunk(self, chunk: List[Tuple[int, bytes]]):
+        """Bir parçayı valide et, benzersizliği toplu sorgularla kontrol et ve toplu ekle"""
+        # 1. Satır bazında UTF-8 + JSON + model validasyonu
+        records: List[Tuple[int, VerificationImport]] = []
+        for line_no, line in chunk:
+            try:
+                text = line.decode("utf-8")
+            except UnicodeDecodeError:
+                self.fail(line_no, "Satır UTF-8 kodlamalı değil")
+                continue
+            try:
+                records.append((line_no, VerificationImport(**json.loads(text))))
+            except ValidationError as e:
+                self.fail(line_no, format_validation_error(e))
+            except (ValueError, TypeError) as e:
+                self.fail(line_no, f"Geçersiz JSON: {e}")
+
+        # 2. Parça içi tekrarlar
+        unique_records = []
+        seen_usernames, seen_emails = set(), set()
+        for line_no, record in records:
+            if record.username in seen_usernames:
+                self.fail(line_no, "Kullanıcı adı dosyada tekrar ediyor", record.username)
+            elif record.email in seen_emails:
+                self.fail(line_no, "E-posta adresi dosyada tekrar ediyor", record.username)
+            else:
+                seen_usernames.add(record.username)
+                seen_emails.add(record.email)
+                unique_records.append((line_no, record))
+
+        if not unique_records:
+            return
+
+        # 3. Veritabanında kayıtlı olanlar (sütun başına toplu in() sorguları)
+        try:
+            existing_usernames, existing_emails = await self.supabase.find_existing_identities(
+                list(seen_usernames), list(seen_emails)
+            )
+        except Exception as e:
+            print(f"Bulk import uniqueness check error: {e}")
+            for line_no, record in unique_records:
+                self.fail(line_no, "Benzersizlik kontrolü yapılamadı", record.username)
+            return
+
+        now = datetime.now().isoformat()
+        rows = []
+        for line_no, record in unique_records:
+            if record.username in existing_usernames:
+                self.fail(line_no, "Bu kullanıcı adı zaten kullanılıyor", record.username)
+                continue
+            if record.email in existing_emails:
+                self.fail(line_no, "Bu e-posta adresi zaten kullanılıyor", record.username)
+                continue
+            rows.append((line_no, record.username, {
+                "id": str(uuid.uuid4()),
+                **record.model_dump(),
+                "status": "pending",
+                "created_at": now,
+                "updated_at": now
+            }))
+
+        # 4. Çok satırlı INSERT
+        await self.insert_rows(rows)
+
+    async def insert_rows(self, rows: List[Tuple[int, str, dict]]):
+        """Satırları tek INSERT ile ekle; satıra özgü hatada parçayı ikiye bölerek
+        hatalı satırları bul, diğerlerini yine de ekle"""
+        if not rows:
+            return
+        try:
+            self.inserted += await self.supabase.insert_verifications([row for _, _, row in rows])
+        except APIError as e:
+            if not str(e.code or "").startswith(ROW_ERROR_SQLSTATE_CLASSES):
+                print(f"Bulk import insert error: {e!r}")
+                self.fail_rows(rows, "Kayıt eklenemedi")
+            elif len(rows) == 1:
+                line_no, username, _ = rows[0]
+                self.fail(line_no, format_insert_error(e), username)
+            else:
+                middle = len(rows) // 2
+                await self.insert_rows(rows[:middle])
+                await self.insert_rows(rows[middle:])
+        except CircuitOpenError:
+            # İstek hiç gönderilmedi
+            self.fail_rows(rows, "Kayıt eklenemedi: veritabanı geçici olarak kullanılamıyor")
+        except ServiceUnavailableError:
+            await self.resolve_ambiguous_insert(rows)
+        except Exception as e:
+            print(f"Bulk import insert error: {e}")
+            self.fail_rows(rows, "Kayıt eklenemedi")
+
+    async def resolve_ambiguous_insert(self, rows: List[Tuple[int, str, dict]]):
+        """Zaman aşımına uğrayan INSERT işlenmiş olabilir: önceden üretilen id'lerle kontrol et"""
+        # Arka planda süren isteğin client timeout'u dolana kadar bekle
+        await asyncio.sleep(settings.db_timeout)
+        try:
+            existing_ids = await self.supabase.find_existing_values('id', [row["id"] for _, _, row in rows])
+        except Exception as e:
+            print(f"Bulk import insert check error: {e}")
+            self.fail_rows(rows, "Kayıt durumu doğrulanamadı, lütfen kontrol edip tekrar deneyin")
+            return
+        for line_no, username, row in rows:
+            if row["id"] in existing_ids:
+                self.inserted += 1
+            else:
+                self.fail(line_no, "Kayıt eklenemedi: veritabanı geçici olarak kullanılamıyor", username)
+
+    def fail_rows(self, rows: List[Tuple[int, str, dict]], error: str):
+        """Parçadaki tüm satırları aynı hata ile kaydet"""
+        for line_no, username, _ in rows:
+            self.fail(line_no, error, username)
+
+    async def run(self, lines: AsyncIterator[bytes]) -> BulkImportResult:
+        """Tüm satırları batch_size'lık parçalar halinde işle"""
+        chunk: List[Tuple[int, bytes]] = []
+        line_no = 0
+        async for line in lines:
+            line_no += 1
+            if not line.strip():
+                continue
+            self.total += 1
+            chunk.append((line_no, line))
+            if len(chunk) >= self.batch_size:
+                await self.process_chunk(chunk)
+                chunk = []
+        if chunk:
+            await self.process_chunk(chunk)
+
+        self.errors.sort(key=lambda error: error.line)
+        return BulkImportResult(
+            total=self.total,
+            inserted=self.inserted,
+            failed=self.total - self.inserted,
+            errors=self.errors
+        )
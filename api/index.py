@@ -2,24 +2,33 @@
 Kimlik Doğrulama Sistemi - FastAPI Backend
 Ana API endpoint'leri
 """
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, Query, status
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional, List
 from datetime import datetime
+import asyncio
 import uuid
 import json
+import csv
+import io
+import os
+import stat
 
 # Local imports - ABSOLUTE IMPORTS
 from models import (
     VerificationCreate, VerificationResponse, VerificationUpdate, 
     VerificationList, SuccessResponse, ErrorResponse, HealthCheck,
-    VerificationStatus
+    VerificationStatus, ExportFormat, BulkImportResult, VerificationStats
 )
 from config import settings, get_supabase_client, SupabaseClient
 from storage import get_storage_manager, StorageManager
+from storage_backends import LocalStorageBackend, FileRangeResponse
+from resilience import CircuitBreaker, CircuitOpenError, ServiceUnavailableError
+from importer import VerificationImporter, iter_lines
+from stats import get_stats_cache, StatsCache
 
 # FastAPI app oluştur
 app = FastAPI(
@@ -49,15 +58,38 @@ app.add_middleware(
 )
 
 
-@app.middleware("http")
-async def add_security_headers(request, call_next):
-    """Güvenlik başlıkları ekle"""
-    response = await call_next(request)
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    response.headers["Strict-Transport-Security"] = "max-age=63072000; includeSubDomains"
-    return response
+class SecurityHeadersMiddleware:
+    """Güvenlik başlıkları ekle
+    
+    Saf ASGI middleware: yanıt gövdesini kendi kuyruğundan geçiren
+    BaseHTTPMiddleware yerine yalnızca başlıklara dokunur; dosya ve akış
+    yanıtları olduğu gibi iletilir.
+    """
+    
+    headers = [
+        (b"x-content-type-options", b"nosniff"),
+        (b"x-frame-options", b"DENY"),
+        (b"x-xss-protection", b"1; mode=block"),
+        (b"strict-transport-security", b"max-age=63072000; includeSubDomains"),
+    ]
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + self.headers
+            await send(message)
+        
+        await self.app(scope, receive, send_with_headers)
+
+
+app.add_middleware(SecurityHeadersMiddleware)
 
 
 @app.exception_handler(HTTPException)
@@ -69,7 +101,8 @@ async def http_exception_handler(request, exc):
             "error": "HTTP_EXCEPTION",
             "message": exc.detail,
             "status_code": exc.status_code
-        }
+        },
+        headers=getattr(exc, "headers", None)
     )
 
 
@@ -89,18 +122,34 @@ async def general_exception_handler(request, exc):
 # === HEALTH CHECK ENDPOINT ===
 @app.get("/api/health", response_model=HealthCheck, tags=["System"])
 async def health_check(
-    supabase: SupabaseClient = Depends(get_supabase_client)
+    supabase: SupabaseClient = Depends(get_supabase_client),
+    storage: StorageManager = Depends(get_storage_manager)
 ):
     """Sistem sağlık kontrolü"""
     try:
         # Veritabanı bağlantısını kontrol et
         db_status = await supabase.health_check()
+        db_circuit = supabase.caller.breaker.state
+        storage_circuit = storage.caller.breaker.state
+        
+        if db_circuit == CircuitBreaker.OPEN:
+            database = "circuit_open"
+        else:
+            database = "connected" if db_status else "disconnected"
+        
+        # Storage durumu son çağrıların sonucunu tutan circuit breaker'dan okunur
+        storage_state = {
+            CircuitBreaker.CLOSED: "connected",
+            CircuitBreaker.HALF_OPEN: "recovering",
+            CircuitBreaker.OPEN: "circuit_open"
+        }[storage_circuit]
         
         return HealthCheck(
-            status="healthy" if db_status else "unhealthy",
+            status="healthy" if db_status and storage_circuit == CircuitBreaker.CLOSED else "unhealthy",
             timestamp=datetime.now(),
-            database="connected" if db_status else "disconnected",
-            storage="connected"  # Storage her zaman bağlı (Supabase)
+            database=database,
+            storage=storage_state,
+            circuits={"database": db_circuit, "storage": storage_circuit}
         )
     except Exception as e:
         return HealthCheck(
@@ -127,7 +176,8 @@ async def submit_verification(
     
     # Dependencies
     supabase: SupabaseClient = Depends(get_supabase_client),
-    storage: StorageManager = Depends(get_storage_manager)
+    storage: StorageManager = Depends(get_storage_manager),
+    stats: StatsCache = Depends(get_stats_cache)
 ):
     """KYC başvurusu gönder"""
     try:
@@ -153,9 +203,20 @@ async def submit_verification(
                 detail="Bu e-posta adresi zaten kullanılıyor"
             )
         
+        # Storage devresi açıksa dosyaları işlemeden hızlıca 503 dön
+        storage.ensure_available()
+        
         # Dosyaları yükle
         id_doc_result = await storage.upload_id_document(id_document, form_data.username)
-        selfie_result = await storage.upload_selfie(selfie, form_data.username)
+        try:
+            selfie_result = await storage.upload_selfie(selfie, form_data.username)
+        except Exception:
+            await storage.delete_file(settings.kyc_documents_bucket, id_doc_result["path"])
+            raise
+        uploaded = [
+            (settings.kyc_documents_bucket, id_doc_result["path"]),
+            (settings.kyc_selfies_bucket, selfie_result["path"])
+        ]
         
         # Veritabanına kaydet
         verification_data = {
@@ -172,14 +233,43 @@ async def submit_verification(
             "updated_at": datetime.now().isoformat()
         }
         
-        response = supabase.client.table('verification_requests').insert(verification_data).execute()
+        async def remove_uploads():
+            # Kayıt oluşmadıysa yüklenen dosyaları sahipsiz bırakma
+            for bucket_name, file_path in uploaded:
+                await storage.delete_file(bucket_name, file_path)
+        
+        try:
+            inserted = await supabase.insert_verification(verification_data)
+        except CircuitOpenError:
+            # Devre açıkken istek hiç gönderilmedi
+            await remove_uploads()
+            raise
+        except ServiceUnavailableError as e:
+            # Zaman aşımında INSERT arka planda sürüp yine de işlenebilir; client
+            # timeout'u dolana kadar bekleyip önceden üretilen id ile kontrol et
+            await asyncio.sleep(settings.db_timeout)
+            try:
+                inserted = await supabase.get_verification(verification_data["id"])
+            except Exception as lookup_error:
+                # Kaydın durumu bilinmiyor: kayda bağlı olabilecek dosyaları silme
+                print(f"Verification lookup error: {lookup_error}")
+                raise e
+            if not inserted:
+                await remove_uploads()
+                raise
+        except Exception:
+            await remove_uploads()
+            raise
         
-        if not response.data:
+        if not inserted:
+            await remove_uploads()
             raise HTTPException(
                 status_code=500,
                 detail="Başvuru kaydedilemedi"
             )
         
+        stats.record_submitted()
+        
         return SuccessResponse(
             message="Kimlik doğrulama başvurunuz başarıyla gönderildi",
             data={
@@ -206,6 +296,8 @@ async def get_verifications(
     per_page: int = Query(10, ge=1, le=100, description="Sayfa başına kayıt"),
     status: Optional[VerificationStatus] = Query(None, description="Durum filtresi"),
     search: Optional[str] = Query(None, description="Arama terimi"),
+    date_from: Optional[datetime] = Query(None, description="Başlangıç tarihi (created_at >=)"),
+    date_to: Optional[datetime] = Query(None, description="Bitiş tarihi (created_at <=)"),
     credentials: HTTPAuthorizationCredentials = Depends(security),
     supabase: SupabaseClient = Depends(get_supabase_client)
 ):
@@ -214,29 +306,21 @@ async def get_verifications(
         # Offset hesapla
         offset = (page - 1) * per_page
         
-        # Query builder
-        query = supabase.client.table('verification_requests').select('*')
-        
-        # Filtreler uygula
-        if status:
-            query = query.eq('status', status.value)
-        
-        if search:
-            # Basit arama (username, email, first_name, last_name)
-            search_term = f"%{search}%"
-            query = query.or_(
-                f"username.ilike.{search_term},"
-                f"email.ilike.{search_term},"
-                f"first_name.ilike.{search_term},"
-                f"last_name.ilike.{search_term}"
-            )
-        
-        # Toplam kayıt sayısını al
-        count_response = query.execute()
-        total = len(count_response.data) if count_response.data else 0
+        # Filtrelenmiş sorgu; toplam sayı aynı istekte (count=exact) döner
+        query = supabase.verification_query(
+            status=status.value if status else None,
+            search=search,
+            date_from=date_from,
+            date_to=date_to,
+            count='exact'
+        )
         
         # Sayfalı veri al
-        data_response = query.order('created_at', desc=True).range(offset, offset + per_page - 1).execute()
+        data_response = await supabase.execute(
+            query.order('created_at', desc=True).range(offset, offset + per_page - 1),
+            hedge=True
+        )
+        total = data_response.count or 0
         
         # Sayfalama bilgileri
         has_next = (offset + per_page) < total
@@ -251,6 +335,8 @@ async def get_verifications(
             has_prev=has_prev
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Get verifications error: {e}")
         raise HTTPException(
@@ -259,19 +345,173 @@ async def get_verifications(
         )
 
 
+@app.get("/api/verifications/stats", response_model=VerificationStats, tags=["Admin"])
+async def get_verification_stats(
+    days: int = Query(30, ge=1, le=365, description="Günlük istatistik için gün sayısı"),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    supabase: SupabaseClient = Depends(get_supabase_client),
+    stats: StatsCache = Depends(get_stats_cache)
+):
+    """Durum sayaçları ve günlük başvuru/inceleme istatistikleri
+    
+    Değerler trigger ile tutulan özet tablolardan okunur; verification_requests
+    taranmaz. Sayaçlar süreç içinde önbelleklenir.
+    """
+    try:
+        return await stats.get_stats(supabase, days)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Get verification stats error: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="İstatistikler alınırken bir hata oluştu"
+        )
+
+
+# Dışa aktarılan kolonlar (CSV başlık sırası)
+EXPORT_COLUMNS = [
+    "id", "username", "first_name", "last_name", "email", "phone",
+    "status", "id_image_url", "selfie_image_url",
+    "created_at", "updated_at", "reviewed_by", "reviewed_at"
+]
+
+
+def format_export_rows(rows: List[dict], export_format: ExportFormat, include_header: bool) -> str:
+    """Bir sayfa kaydı NDJSON veya CSV metnine çevir"""
+    if export_format == ExportFormat.NDJSON:
+        return "".join(
+            json.dumps({column: row.get(column) for column in EXPORT_COLUMNS}, ensure_ascii=False, default=str) + "\n"
+            for row in rows
+        )
+    
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if include_header:
+        writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow(["" if row.get(column) is None else row.get(column) for column in EXPORT_COLUMNS])
+    return buffer.getvalue()
+
+
+@app.get("/api/verifications/export", tags=["Admin"])
+async def export_verifications(
+    request: Request,
+    export_format: ExportFormat = Query(ExportFormat.NDJSON, alias="format", description="Çıktı formatı (ndjson, csv)"),
+    status: Optional[VerificationStatus] = Query(None, description="Durum filtresi"),
+    search: Optional[str] = Query(None, description="Arama terimi"),
+    date_from: Optional[datetime] = Query(None, description="Başlangıç tarihi (created_at >=)"),
+    date_to: Optional[datetime] = Query(None, description="Bitiş tarihi (created_at <=)"),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    supabase: SupabaseClient = Depends(get_supabase_client)
+):
+    """Doğrulama kayıtlarını NDJSON/CSV olarak akış halinde dışa aktar
+    
+    Kayıtlar keyset sayfalama ile settings.export_batch_size'lık parçalar halinde
+    okunur ve okundukça gönderilir; bellek kullanımı tablo boyutundan bağımsızdır.
+    İlk sayfa yanıt başlıklarından önce okunur; istemci bağlantıyı kapatırsa
+    bir sonraki sayfa okunmadan durulur.
+    """
+    pages = supabase.iter_verification_pages(
+        settings.export_batch_size,
+        status=status.value if status else None,
+        search=search,
+        date_from=date_from,
+        date_to=date_to
+    )
+    
+    async def next_page() -> Optional[List[dict]]:
+        try:
+            return await pages.__anext__()
+        except StopAsyncIteration:
+            return None
+    
+    try:
+        # İlk sayfa yanıt başlıkları gönderilmeden okunur; veritabanı erişilemiyorsa
+        # istemci boş bir 200 yerine Retry-After'lı 503 alır
+        first_page = await next_page()
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Export verifications error: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Dışa aktarma sırasında bir hata oluştu"
+        )
+    
+    async def generate():
+        include_header = True
+        rows = first_page
+        try:
+            while rows is not None:
+                yield format_export_rows(rows, export_format, include_header)
+                include_header = False
+                if await request.is_disconnected():
+                    break
+                rows = await next_page()
+            if include_header and export_format == ExportFormat.CSV:
+                # Boş sonuçta da başlık satırı gönder
+                yield format_export_rows([], export_format, True)
+        except Exception as e:
+            # Yanıt başlıkları gönderildiği için hata kodu dönülemez; hatayı
+            # yükselterek sunucunun chunked yanıtı sonlandırmadan kesmesini sağla,
+            # böylece istemci eksik dosyayı tamamlanmış sanmaz
+            print(f"Export verifications error: {e}")
+            raise
+        finally:
+            await pages.aclose()
+    
+    media_type = "application/x-ndjson" if export_format == ExportFormat.NDJSON else "text/csv"
+    filename = f"verifications-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{export_format.value}"
+    return StreamingResponse(
+        generate(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@app.post("/api/verifications/import", response_model=BulkImportResult, tags=["Admin"])
+async def import_verifications(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    supabase: SupabaseClient = Depends(get_supabase_client),
+    stats: StatsCache = Depends(get_stats_cache)
+):
+    """NDJSON formatında toplu doğrulama kaydı içe aktar
+    
+    Her satır bir VerificationImport nesnesidir (form alanları + önceden
+    yüklenmiş görsel URL'leri). Satırlar settings.import_batch_size'lık
+    parçalar halinde valide edilir; benzersizlik sütun başına toplu in() sorgularıyla
+    kontrol edilir ve geçerli satırlar tek bir INSERT ile eklenir; veritabanı
+    bir satırı reddederse parça bölünerek hata satır bazında raporlanır.
+    """
+    try:
+        importer = VerificationImporter(supabase)
+        result = await importer.run(iter_lines(request.stream()))
+        stats.record_submitted(result.inserted)
+        return result
+    except Exception as e:
+        print(f"Import verifications error: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="İçe aktarma sırasında bir hata oluştu"
+        )
+
+
 @app.patch("/api/verifications/{verification_id}", response_model=SuccessResponse, tags=["Admin"])
 async def update_verification_status(
     verification_id: str,
     update_data: VerificationUpdate,
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    supabase: SupabaseClient = Depends(get_supabase_client)
+    supabase: SupabaseClient = Depends(get_supabase_client),
+    stats: StatsCache = Depends(get_stats_cache)
 ):
     """Doğrulama durumunu güncelle (Onayla/Reddet)"""
     try:
         # Mevcut kaydı kontrol et
-        existing = supabase.client.table('verification_requests').select('*').eq('id', verification_id).execute()
+        existing = await supabase.get_verification(verification_id)
         
-        if not existing.data:
+        if not existing:
             raise HTTPException(
                 status_code=404,
                 detail="Doğrulama talebi bulunamadı"
@@ -288,14 +528,16 @@ async def update_verification_status(
             update_payload["reviewed_by"] = update_data.reviewed_by
         
         # Güncelleme yap
-        response = supabase.client.table('verification_requests').update(update_payload).eq('id', verification_id).execute()
+        updated = await supabase.update_verification(verification_id, update_payload)
         
-        if not response.data:
+        if not updated:
             raise HTTPException(
                 status_code=500,
                 detail="Güncelleme yapılamadı"
             )
         
+        stats.record_status_change(existing.get('status'), update_data.status.value)
+        
         status_text = {
             "approved": "onaylandı",
             "rejected": "reddedildi"
@@ -303,7 +545,7 @@ async def update_verification_status(
         
         return SuccessResponse(
             message=f"Doğrulama talebi {status_text.get(update_data.status.value, 'güncellendi')}",
-            data=response.data[0]
+            data=updated
         )
         
     except HTTPException:
@@ -324,15 +566,15 @@ async def get_verification_detail(
 ):
     """Tek bir doğrulama talebinin detayını getir"""
     try:
-        response = supabase.client.table('verification_requests').select('*').eq('id', verification_id).execute()
+        verification = await supabase.get_verification(verification_id)
         
-        if not response.data:
+        if not verification:
             raise HTTPException(
                 status_code=404,
                 detail="Doğrulama talebi bulunamadı"
             )
         
-        return VerificationResponse(**response.data[0])
+        return VerificationResponse(**verification)
         
     except HTTPException:
         raise
@@ -344,6 +586,39 @@ async def get_verification_detail(
         )
 
 
+# === DOSYA SUNUMU (yerel depolama backend'i) ===
+@app.api_route("/api/files/{bucket_name}/{file_path:path}", methods=["GET", "HEAD"], tags=["Storage"])
+async def serve_file(
+    bucket_name: str,
+    file_path: str,
+    request: Request,
+    expires: Optional[int] = Query(None, description="İmzalı URL son geçerlilik zamanı"),
+    signature: Optional[str] = Query(None, description="İmzalı URL imzası"),
+    storage: StorageManager = Depends(get_storage_manager)
+):
+    """Yerel diskteki dosyayı Range ve önbellek başlıklarıyla sun"""
+    backend = storage.backend
+    # FaultInjectingBackend yerel backend'i sarar ve ona özgü metodları iletir
+    if not isinstance(getattr(backend, "backend", backend), LocalStorageBackend):
+        raise HTTPException(status_code=404, detail="Dosya bulunamadı")
+    
+    if signature is not None or not settings.local_storage_public:
+        if expires is None or signature is None or not backend.verify_signature(bucket_name, file_path, expires, signature):
+            raise HTTPException(status_code=403, detail="Geçersiz veya süresi dolmuş imza")
+    
+    try:
+        full_path = backend.resolve_path(bucket_name, file_path)
+        stat_result = os.stat(full_path)
+    except (ValueError, FileNotFoundError, NotADirectoryError):
+        raise HTTPException(status_code=404, detail="Dosya bulunamadı")
+    
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise HTTPException(status_code=404, detail="Dosya bulunamadı")
+    
+    # Kimlik belgeleri ve selfie'ler paylaşımlı önbelleklerde (proxy/CDN) tutulmamalı
+    return FileRangeResponse(full_path, stat_result, request.headers, cache_control="private, max-age=3600")
+
+
 # === UYGULAMA BAŞLATMA ===
 if __name__ == "__main__":
     import uvicorn
@@ -3,7 +3,7 @@ Pydantic modelleri - API için veri validasyonu
 """
 from pydantic import BaseModel, EmailStr, field_validator, Field
 from typing import Optional, List
-from datetime import datetime
+from datetime import datetime, date
 from enum import Enum
 import re
 
@@ -15,6 +15,12 @@ class VerificationStatus(str, Enum):
     REJECTED = "rejected"
 
 
+class ExportFormat(str, Enum):
+    """Dışa aktarma formatı enum'u"""
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
 class VerificationBase(BaseModel):
     """Temel doğrulama modeli"""
     username: str = Field(..., min_length=3, max_length=50, description="Kullanıcı adı")
@@ -61,6 +67,20 @@ class VerificationCreate(VerificationBase):
     pass
 
 
+class VerificationImport(VerificationCreate):
+    """Toplu içe aktarma satırı (görseller önceden yüklenmiş)"""
+    id_image_url: str = Field(..., max_length=2048, description="Kimlik belgesi görsel URL'i")
+    selfie_image_url: str = Field(..., max_length=2048, description="Selfie görsel URL'i")
+    
+    @field_validator('id_image_url', 'selfie_image_url')
+    @classmethod
+    def validate_image_url(cls, v):
+        """Görsel URL validasyonu"""
+        if not v.startswith(('https://', 'http://')):
+            raise ValueError('Görsel URL http:// veya https:// ile başlamalıdır')
+        return v
+
+
 class VerificationResponse(VerificationBase):
     """Doğrulama isteği yanıt modeli"""
     id: str
@@ -95,6 +115,41 @@ class VerificationList(BaseModel):
     has_prev: bool
 
 
+class BulkImportError(BaseModel):
+    """Toplu içe aktarmada satır hatası"""
+    line: int
+    username: Optional[str] = None
+    error: str
+
+
+class BulkImportResult(BaseModel):
+    """Toplu içe aktarma sonuç modeli"""
+    total: int
+    inserted: int
+    failed: int
+    errors: List[BulkImportError]
+
+
+class DailyStats(BaseModel):
+    """Günlük başvuru ve inceleme istatistikleri"""
+    day: date
+    submitted: int = 0
+    reviewed: int = 0
+    approved: int = 0
+    rejected: int = 0
+    avg_review_seconds: Optional[float] = None
+
+
+class VerificationStats(BaseModel):
+    """Doğrulama durum sayaçları ve günlük istatistikler"""
+    total: int
+    pending: int
+    approved: int
+    rejected: int
+    daily: List[DailyStats]
+    updated_at: datetime
+
+
 class FileUploadResponse(BaseModel):
     """Dosya yükleme yanıt modeli"""
     url: str
@@ -123,4 +178,5 @@ class HealthCheck(BaseModel):
     timestamp: datetime
     version: str = "1.0.0"
     database: str = "connected"
-    storage: str = "connected" 
\ No newline at end of file
+    storage: str = "connected"
+    circuits: Optional[dict] = None 
\ No newline at end of file
@@ -0,0 +1,255 @@
+"""
+Dış servis çağrıları için dayanıklılık katmanı - timeout, retry, hedging, circuit breaker
+"""
+import asyncio
+import random
+import time
+from typing import Any, Callable, Optional
+import anyio
+import httpx
+from fastapi import HTTPException
+
+
+class ServiceUnavailableError(HTTPException):
+    """Bağımlı servis geçici olarak kullanılamıyor (503)
+
+    HTTPException alt sınıfı olduğu için endpoint'lerdeki `except HTTPException:
+    raise` blokları bu hatayı 500'e çevirmeden iletir.
+    """
+
+    def __init__(self, service: str, detail: Optional[str] = None, retry_after: Optional[int] = None):
+        super().__init__(
+            status_code=503,
+            detail=detail or f"{service} servisi geçici olarak kullanılamıyor, lütfen tekrar deneyin",
+            headers={"Retry-After": str(retry_after)} if retry_after else None
+        )
+        self.service = service
+
+    def __str__(self) -> str:
+        return self.detail
+
+
+class CircuitOpenError(ServiceUnavailableError):
+    """Circuit breaker açık: çağrı yapılmadan hızlıca reddedildi"""
+
+
+# Bağlantı/kaynak kaynaklı PostgREST ve PostgreSQL hataları: PGRST000-003
+# (veritabanına bağlanılamadı / bağlantı havuzu zaman aşımı), 57014 (sorgu iptali)
+TRANSIENT_ERROR_CODES = {"PGRST000", "PGRST001", "PGRST002", "PGRST003", "57014"}
+# SQLSTATE sınıfları: 08 bağlantı hatası, 53 yetersiz kaynak
+TRANSIENT_SQLSTATE_CLASSES = ("08", "53")
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Hata tekrar denemeye değer mi (zaman aşımı, bağlantı, 5xx/429, geçici DB hataları)"""
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status >= 500 or status == 429
+    # postgrest APIError kodu `code` alanında, storage3 StorageException ise
+    # durum kodunu args[0] sözlüğünde (statusCode) taşır
+    details = exc.args[0] if exc.args and isinstance(exc.args[0], dict) else {}
+    for attr in ("status_code", "statusCode", "status", "code"):
+        value = getattr(exc, attr, None)
+        if value is None:
+            value = details.get(attr)
+        if value is None:
+            continue
+        code = str(value)
+        if code in TRANSIENT_ERROR_CODES or (len(code) == 5 and code.startswith(TRANSIENT_SQLSTATE_CLASSES)):
+            return True
+        try:
+            status = int(code)
+        except ValueError:
+            continue
+        # PostgreSQL hata kodları (ör. 23505) HTTP durum kodu değildir
+        if 100 <= status <= 599:
+            return status >= 500 or status == 429
+    return False
+
+
+class CircuitBreaker:
+    """Ardışık hatalarda devreyi açan, bekleme sonrası tek deneme ile kapatan breaker
+
+    closed: çağrılar serbest. open: reset_timeout boyunca çağrılar hemen
+    reddedilir. half_open: tek bir deneme çağrısına izin verilir; başarılıysa
+    devre kapanır, başarısızsa tekrar açılır.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        self._state = self.CLOSED
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        """Güncel durum (open süresi dolduysa half_open)"""
+        if self._state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def retry_after(self) -> int:
+        """Devrenin yeniden denenmesine kalan saniye"""
+        return max(1, int(self.reset_timeout - (time.monotonic() - self.opened_at)))
+
+    def before_call(self):
+        """Çağrıya izin ver ya da CircuitOpenError fırlat"""
+        state = self.state
+        if state == self.OPEN or (state == self.HALF_OPEN and self._probe_in_flight):
+            raise CircuitOpenError(self.name, retry_after=self.retry_after())
+        if state == self.HALF_OPEN:
+            self._probe_in_flight = True
+
+    def release_probe(self):
+        """Sonuçlanmadan iptal edilen deneme çağrısının iznini geri ver"""
+        self._probe_in_flight = False
+
+    def record_success(self):
+        """Başarılı çağrı: devreyi kapat"""
+        self.failures = 0
+        self._state = self.CLOSED
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        """Geçici hata: eşik aşıldıysa veya deneme başarısızsa devreyi aç"""
+        self.failures += 1
+        if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                print(f"Circuit breaker açıldı: {self.name} ({self.failures} ardışık hata)")
+            self._state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+
+class ResilientCaller:
+    """Senkron servis çağrılarını threadpool'da timeout, retry ve breaker ile çalıştırır
+
+    - timeout: deneme başına süre sınırı
+    - deadline: retry'lar dahil toplam süre bütçesi
+    - retries: yalnızca idempotent çağrılarda, geçici hatalarda ek deneme
+      sayısı (full jitter exponential backoff ile)
+    - hedge_delay: > 0 ise hedge=True okumalarda ilk deneme bu süre içinde
+      bitmezse ikinci bir istek başlatılır, önce biten kullanılır
+    """
+
+    def __init__(
+        self,
+        name: str,
+        timeout: float,
+        deadline: float,
+        retries: int = 2,
+        backoff: float = 0.2,
+        hedge_delay: float = 0.0,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge_delay = hedge_delay
+        self.breaker = breaker or CircuitBreaker(name)
+
+    async def _attempt(self, func: Callable[[], Any], timeout: float) -> Any:
+        """Tek deneme (zaman aşımında thread arka planda bitmeye bırakılır)"""
+        return await asyncio.wait_for(anyio.to_thread.run_sync(func, cancellable=True), timeout)
+
+    async def _hedged_attempt(self, func: Callable[[], Any], timeout: float) -> Any:
+        """İlk deneme hedge_delay içinde bitmezse ikinci isteği başlat"""
+        first = asyncio.ensure_future(self._attempt(func, timeout))
+        done, _ = await asyncio.wait({first}, timeout=self.hedge_delay)
+        if done:
+            return first.result()
+
+        pending = {first, asyncio.ensure_future(self._attempt(func, max(timeout - self.hedge_delay, 0.001)))}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def call(self, func: Callable[[], Any], idempotent: bool = True, hedge: bool = False) -> Any:
+        """Çağrıyı dayanıklılık politikalarıyla çalıştır"""
+        self.breaker.before_call()
+        try:
+            return await self._call_with_retries(func, idempotent, hedge)
+        except asyncio.CancelledError:
+            self.breaker.release_probe()
+            raise
+
+    async def _call_with_retries(self, func: Callable[[], Any], idempotent: bool, hedge: bool) -> Any:
+        """Deneme döngüsü: geçici hatalarda jitter'lı backoff ile tekrar dene"""
+        started = time.monotonic()
+        attempts = 1 + (self.retries if idempotent else 0)
+        for attempt in range(attempts):
+            remaining = self.deadline - (time.monotonic() - started)
+            timeout = min(self.timeout, remaining)
+            try:
+                if timeout <= 0:
+                    raise asyncio.TimeoutError()
+                if hedge and self.hedge_delay > 0:
+                    result = await self._hedged_attempt(func, timeout)
+                else:
+                    result = await self._attempt(func, timeout)
+            except Exception as e:
+                if not is_transient(e):
+                    # Servis yanıt verdi (ör. 4xx / unique ihlali): breaker açısından başarı
+                    self.breaker.record_success()
+                    raise
+                print(f"{self.name} geçici hata (deneme {attempt + 1}/{attempts}): {e!r}")
+                last_attempt = attempt == attempts - 1
+                delay = random.uniform(0, self.backoff * (2 ** attempt))
+                if last_attempt or time.monotonic() - started + delay >= self.deadline:
+                    self.breaker.record_failure()
+                    raise ServiceUnavailableError(self.name) from e
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+
+class FaultInjector:
+    """Yerel testler için hata ve gecikme enjekte eden yardımcı
+
+    Her çağrıda `latency` kadar bekler; `stall_rate` olasılıkla `stall_time`
+    boyunca takılır, `error_rate` olasılıkla geçici bir bağlantı hatası fırlatır.
+    """
+
+    def __init__(
+        self,
+        error_rate: float = 0.0,
+        latency: float = 0.0,
+        stall_rate: float = 0.0,
+        stall_time: float = 30.0,
+        seed: Optional[int] = None
+    ):
+        self.error_rate = error_rate
+        self.latency = latency
+        self.stall_rate = stall_rate
+        self.stall_time = stall_time
+        self.random = random.Random(seed)
+
+    def run(self, func: Callable[[], Any]) -> Any:
+        """Senkron çağrıyı enjekte edilen hatalarla çalıştır"""
+        roll = self.random.random()
+        time.sleep(self.stall_time if roll < self.stall_rate else self.latency)
+        if self.random.random() < self.error_rate:
+            raise ConnectionError("Enjekte edilmiş geçici hata")
+        return func()
@@ -0,0 +1,102 @@
+"""
+Doğrulama istatistikleri - trigger ile tutulan özet tablolar ve süreç içi önbellek
+"""
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from models import VerificationStatus, VerificationStats, DailyStats
+from config import settings, SupabaseClient
+
+
+class StatsCache:
+    """Durum sayaçları için süreç içi önbellek
+
+    Sayaçlar verification_status_counts özet tablosundan yüklenir ve bu
+    süreçteki yazma olaylarıyla (başvuru, toplu içe aktarma, durum değişikliği)
+    anında güncellenir. Diğer instance'ların yazdıkları stats_cache_ttl
+    saniyesi dolunca tablodan yeniden yüklenerek yansır.
+    """
+
+    def __init__(self, ttl: Optional[int] = None):
+        self.ttl = settings.stats_cache_ttl if ttl is None else ttl
+        self._counts: Optional[Dict[str, int]] = None
+        self._loaded_at = 0.0
+        self.updated_at: Optional[datetime] = None
+
+    def is_stale(self) -> bool:
+        """Önbellek yeniden yüklenmeli mi"""
+        return self._counts is None or time.monotonic() - self._loaded_at >= self.ttl
+
+    def invalidate(self):
+        """Bir sonraki okumada tablodan yeniden yüklenmesini sağla"""
+        self._loaded_at = 0.0
+
+    async def get_counts(self, supabase: SupabaseClient) -> Dict[str, int]:
+        """Durum sayaçlarını döndür (gerekirse özet tablodan yenile)"""
+        if self.is_stale():
+            try:
+                counts = {status.value: 0 for status in VerificationStatus}
+                counts.update(await supabase.get_status_counts())
+                self._counts = counts
+                self._loaded_at = time.monotonic()
+                self.updated_at = datetime.now()
+            except Exception as e:
+                # Daha önce yüklenmiş değer varsa eski veriyle devam et
+                if self._counts is None:
+                    raise
+                print(f"İstatistik yenileme hatası: {e}")
+        return dict(self._counts)
+
+    def record_submitted(self, count: int = 1):
+        """Yeni başvuru olayı: pending sayacını artır"""
+        if self._counts is None or count <= 0:
+            return
+        self._counts[VerificationStatus.PENDING.value] += count
+        self.updated_at = datetime.now()
+
+    def record_status_change(self, old_status: str, new_status: str):
+        """Durum değişikliği olayı: sayaçları taşı"""
+        if self._counts is None or old_status == new_status:
+            return
+        if old_status in self._counts:
+            self._counts[old_status] -= 1
+        if new_status in self._counts:
+            self._counts[new_status] += 1
+        self.updated_at = datetime.now()
+
+    async def get_stats(self, supabase: SupabaseClient, days: int) -> VerificationStats:
+        """Sayaçlar ve son `days` günün istatistiklerini birleştir"""
+        counts = await self.get_counts(supabase)
+
+        # Günlük istatistikler özet tablodan primary key aralığıyla okunur;
+        # trigger günleri UTC'ye göre tuttuğu için pencere de UTC'ye göre hesaplanır
+        since = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+        daily = []
+        for row in await supabase.get_daily_stats(since):
+            reviewed = row.get('reviewed') or 0
+            daily.append(DailyStats(
+                day=row['day'],
+                submitted=row.get('submitted') or 0,
+                reviewed=reviewed,
+                approved=row.get('approved') or 0,
+                rejected=row.get('rejected') or 0,
+                avg_review_seconds=(row.get('review_seconds_total') or 0) / reviewed if reviewed else None
+            ))
+
+        return VerificationStats(
+            total=sum(counts.values()),
+            pending=counts.get(VerificationStatus.PENDING.value, 0),
+            approved=counts.get(VerificationStatus.APPROVED.value, 0),
+            rejected=counts.get(VerificationStatus.REJECTED.value, 0),
+            daily=daily,
+            updated_at=self.updated_at or datetime.now()
+        )
+
+
+# Global stats cache instance
+stats_cache = StatsCache()
+
+
+def get_stats_cache() -> StatsCache:
+    """Dependency injection için istatistik önbelleğini döndür"""
+    return stats_cache
@@ -1,5 +1,5 @@
 """
-Supabase Storage ile dosya yükleme işlemleri
+Dosya yükleme işlemleri (Supabase Storage veya yerel disk backend'i)
 """
 import os
 import uuid
@@ -8,14 +8,49 @@ from typing import Optional, Tuple
 from fastapi import UploadFile, HTTPException
 from PIL import Image
 import io
-from config import settings, supabase_client
+from config import settings, available_image_formats
+from storage_backends import StorageBackend, create_storage_backend
+from resilience import ResilientCaller, CircuitBreaker, CircuitOpenError
+
+# Çıktı formatı -> (PIL formatı, content-type, dosya uzantısı)
+OUTPUT_FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg", "jpg"),
+    "webp": ("WEBP", "image/webp", "webp"),
+    "avif": ("AVIF", "image/avif", "avif"),
+}
 
 
 class StorageManager:
     """Dosya yükleme ve depolama yöneticisi"""
     
-    def __init__(self):
-        self.client = supabase_client.client
+    def __init__(self, backend: Optional[StorageBackend] = None):
+        self._backend = backend
+        self.caller = ResilientCaller(
+            "storage",
+            timeout=settings.storage_timeout,
+            deadline=settings.storage_deadline,
+            retries=settings.retry_attempts,
+            backoff=settings.retry_backoff,
+            hedge_delay=settings.hedge_delay,
+            breaker=CircuitBreaker(
+                "storage",
+                failure_threshold=settings.breaker_failure_threshold,
+                reset_timeout=settings.breaker_reset_timeout
+            )
+        )
+    
+    @property
+    def backend(self) -> StorageBackend:
+        """Depolama backend'ini ilk kullanımda oluştur"""
+        if self._backend is None:
+            self._backend = create_storage_backend()
+        return self._backend
+    
+    def ensure_available(self):
+        """Storage devresi açıksa yükleme maliyetine girmeden 503 döndür"""
+        breaker = self.caller.breaker
+        if breaker.state == CircuitBreaker.OPEN:
+            raise CircuitOpenError("storage", retry_after=breaker.retry_after())
     
     def validate_file(self, file: UploadFile) -> bool:
         """Dosya validasyonu"""
@@ -43,8 +78,84 @@ class StorageManager:
         
         return True
     
-    def optimize_image(self, file_content: bytes, max_width: int = 1920, quality: int = 85) -> bytes:
-        """Görüntü optimizasyonu"""
+    def resolve_output_format(self, output_format: Optional[str] = None) -> str:
+        """Kullanılacak çıktı formatını belirle (desteklenmiyorsa JPEG'e düş)"""
+        fmt = (output_format or settings.image_output_format).lower()
+        # AVIF/WebP kodlayıcısı Pillow kurulumunda yoksa JPEG kullan
+        # (eksik kodlayıcı başlangıçta Settings.validate() ile raporlanır)
+        if fmt not in OUTPUT_FORMATS or fmt not in available_image_formats():
+            return "jpeg"
+        return fmt
+    
+    def encode_image(self, image: Image.Image, output_format: str, quality: int, final: bool = True) -> bytes:
+        """Görüntüyü verilen format ve kalitede kodla"""
+        output = io.BytesIO()
+        if output_format == "jpeg":
+            if not final:
+                # Kalite araması için ucuz baseline kodlama (son çıktı genellikle daha küçüktür)
+                image.save(output, format='JPEG', quality=quality)
+            elif settings.image_progressive:
+                # Progressive tarama daha küçük dosya ve kademeli gösterim sağlar,
+                # ancak kodlaması baseline + optimize'dan daha yavaştır
+                image.save(output, format='JPEG', quality=quality, progressive=True)
+            else:
+                image.save(output, format='JPEG', quality=quality, optimize=True)
+        elif output_format == "webp":
+            # Kalite aramasında en hızlı yöntem, son çıktıda daha iyi sıkıştırma
+            image.save(output, format='WEBP', quality=quality, method=4 if final else 0)
+        else:
+            image.save(output, format=OUTPUT_FORMATS[output_format][0], quality=quality)
+        return output.getvalue()
+    
+    def select_quality(self, image: Image.Image, output_format: str, quality: int) -> Tuple[bytes, int]:
+        """Hedef bayt bütçesine sığan en yüksek kaliteyi ikili arama ile bul"""
+        target_bytes = settings.image_target_bytes
+        if target_bytes <= 0:
+            return self.encode_image(image, output_format, quality), quality
+        
+        # AVIF'te deneme kodlaması son çıktıyla aynıdır, tekrar kullanılabilir;
+        # diğer formatlarda deneme çıktıları bellekte tutulmaz
+        reuse_trials = output_format == "avif"
+        trials = {}
+        
+        def trial_size(q: int) -> int:
+            data = self.encode_image(image, output_format, q, final=False)
+            if reuse_trials:
+                trials[q] = data
+            return len(data)
+        
+        # Basit görüntüler çoğunlukla en yüksek kalitede bütçeye sığar: tek deneme
+        best = settings.image_min_quality
+        if trial_size(quality) <= target_bytes:
+            best = quality
+        else:
+            low, high = settings.image_min_quality, quality - 1
+            while low <= high:
+                mid = (low + high) // 2
+                if trial_size(mid) <= target_bytes:
+                    best = mid
+                    low = mid + 1
+                else:
+                    high = mid - 1
+        
+        if best in trials:
+            return trials[best], best
+        return self.encode_image(image, output_format, best), best
+    
+    def optimize_image(
+        self,
+        file_content: bytes,
+        max_width: Optional[int] = None,
+        quality: Optional[int] = None,
+        output_format: Optional[str] = None
+    ) -> Tuple[bytes, Optional[str], Optional[str]]:
+        """Görüntü optimizasyonu
+        
+        (içerik, content-type, uzantı) döndürür. Hata durumunda orijinal içerik
+        ve None değerleri döner; çağıran taraf orijinal dosya tipini kullanır.
+        """
+        max_width = max_width or settings.image_max_width
+        quality = quality or settings.image_quality
         try:
             # PIL ile görüntüyü aç
             image = Image.open(io.BytesIO(file_content))
@@ -68,30 +179,39 @@ class StorageManager:
                 new_height = int(image.height * ratio)
                 image = image.resize((max_width, new_height), Image.Resampling.LANCZOS)
             
+            # Paletli ve gri+alfa görüntülerde saydamlığı koru
+            if image.mode in ('P', 'LA'):
+                image = image.convert('RGBA')
+            
             # RGB'ye çevir (eğer RGBA ise)
-            if image.mode in ('RGBA', 'LA'):
+            if image.mode == 'RGBA':
                 background = Image.new('RGB', image.size, (255, 255, 255))
-                background.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
+                background.paste(image, mask=image.split()[-1])
                 image = background
+            elif image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
             
-            # Optimize edilmiş görüntüyü kaydet
-            output = io.BytesIO()
-            image.save(output, format='JPEG', quality=quality, optimize=True)
-            return output.getvalue()
+            # Optimize edilmiş görüntüyü kodla
+            fmt = self.resolve_output_format(output_format)
+            content, _ = self.select_quality(image, fmt, quality)
+            _, content_type, extension = OUTPUT_FORMATS[fmt]
+            return content, content_type, extension
             
         except Exception as e:
             print(f"Görüntü optimizasyon hatası: {e}")
-            return file_content  # Hata durumunda orijinal dosyayı döndür
+            return file_content, None, None  # Hata durumunda orijinal dosyayı döndür
     
-    def generate_unique_filename(self, original_filename: str) -> str:
+    def generate_unique_filename(self, original_filename: str, extension: Optional[str] = None) -> str:
         """Benzersiz dosya adı oluştur"""
-        file_extension = original_filename.split('.')[-1].lower() if '.' in original_filename else 'jpg'
+        file_extension = extension or (original_filename.split('.')[-1].lower() if '.' in original_filename else 'jpg')
         unique_id = str(uuid.uuid4())
         return f"{unique_id}.{file_extension}"
     
     async def upload_file(self, file: UploadFile, bucket_name: str, folder: str = "") -> dict:
-        """Dosyayı Supabase Storage'a yükle"""
+        """Dosyayı depolama backend'ine yükle"""
         try:
+            self.ensure_available()
+            
             # Dosya validasyonu
             self.validate_file(file)
             
@@ -99,37 +219,29 @@ class StorageManager:
             file_content = await file.read()
             
             # Görüntü optimizasyonu
-            optimized_content = self.optimize_image(file_content)
+            optimized_content, content_type, extension = self.optimize_image(file_content)
+            if content_type is None:
+                # Optimizasyon başarısız: orijinal içerik ve tipiyle yükle
+                content_type = file.content_type
             
             # Benzersiz dosya adı oluştur
-            filename = self.generate_unique_filename(file.filename)
+            filename = self.generate_unique_filename(file.filename, extension)
             file_path = f"{folder}/{filename}" if folder else filename
             
-            # Supabase Storage'a yükle
-            response = self.client.storage.from_(bucket_name).upload(
-                path=file_path,
-                file=optimized_content,
-                file_options={
-                    "content-type": "image/jpeg",
-                    "cache-control": "3600"
-                }
+            # Depolama backend'ine yükle (yol benzersiz ve üzerine yazılabilir olduğu için tekrar denenebilir)
+            await self.caller.call(
+                lambda: self.backend.upload(bucket_name, file_path, optimized_content, content_type)
             )
             
-            if response.status_code not in [200, 201]:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Dosya yükleme hatası: {response.error}"
-                )
-            
             # Dosya URL'ini al
-            public_url = self.client.storage.from_(bucket_name).get_public_url(file_path)
+            public_url = self.backend.get_public_url(bucket_name, file_path)
             
             return {
                 "url": public_url,
                 "filename": filename,
                 "path": file_path,
                 "size": len(optimized_content),
-                "content_type": "image/jpeg"
+                "content_type": content_type
             }
             
         except HTTPException:
@@ -154,19 +266,18 @@ class StorageManager:
     async def delete_file(self, bucket_name: str, file_path: str) -> bool:
         """Dosya silme"""
         try:
-            response = self.client.storage.from_(bucket_name).remove([file_path])
-            return response.status_code == 200
+            return await self.caller.call(lambda: self.backend.delete(bucket_name, file_path))
         except Exception as e:
             print(f"Dosya silme hatası: {e}")
             return False
     
-    def get_signed_url(self, bucket_name: str, file_path: str, expires_in: int = 3600) -> str:
+    async def get_signed_url(self, bucket_name: str, file_path: str, expires_in: int = 3600) -> str:
         """İmzalı URL oluştur (güvenli erişim için)"""
         try:
-            response = self.client.storage.from_(bucket_name).create_signed_url(
-                file_path, expires_in
+            return await self.caller.call(
+                lambda: self.backend.get_signed_url(bucket_name, file_path, expires_in),
+                hedge=True
             )
-            return response.get('signedURL', '')
         except Exception as e:
             print(f"İmzalı URL oluşturma hatası: {e}")
             return ""
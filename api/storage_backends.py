@@ -0,0 +1,335 @@
+"""
+Depolama backend'leri - Supabase Storage ve yerel disk
+"""
+import os
+import hmac
+import time
+import hashlib
+import tempfile
+import mimetypes
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple
+from urllib.parse import quote
+import anyio
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+from config import settings, supabase_client
+from resilience import FaultInjector
+
+# Python'un mimetypes tablosunda bulunmayabilecek çıktı formatları
+mimetypes.add_type("image/webp", ".webp")
+mimetypes.add_type("image/avif", ".avif")
+
+
+class StorageBackend:
+    """Depolama backend arayüzü"""
+
+    def upload(self, bucket_name: str, file_path: str, content: bytes, content_type: str, cache_control: str = "3600"):
+        """Dosyayı yükle (hata durumunda exception fırlatır)"""
+        raise NotImplementedError
+
+    def delete(self, bucket_name: str, file_path: str) -> bool:
+        """Dosyayı sil"""
+        raise NotImplementedError
+
+    def get_signed_url(self, bucket_name: str, file_path: str, expires_in: int = 3600) -> str:
+        """Süreli imzalı URL oluştur"""
+        raise NotImplementedError
+
+    def get_public_url(self, bucket_name: str, file_path: str) -> str:
+        """Herkese açık URL oluştur"""
+        raise NotImplementedError
+
+
+class SupabaseStorageBackend(StorageBackend):
+    """Supabase Storage backend'i"""
+
+    @property
+    def client(self):
+        """Supabase client'ı ilk kullanımda al"""
+        return supabase_client.client
+
+    def upload(self, bucket_name: str, file_path: str, content: bytes, content_type: str, cache_control: str = "3600"):
+        response = self.client.storage.from_(bucket_name).upload(
+            path=file_path,
+            file=content,
+            file_options={
+                "content-type": content_type,
+                "cache-control": cache_control,
+                # Tekrar denenen yüklemede "zaten var" hatası yerine aynı içeriği yaz
+                "x-upsert": "true"
+            }
+        )
+        if response.status_code not in [200, 201]:
+            raise RuntimeError(f"Supabase upload hatası ({response.status_code}): {response.text}")
+
+    def delete(self, bucket_name: str, file_path: str) -> bool:
+        # storage3 hata durumunda StorageException fırlatır
+        self.client.storage.from_(bucket_name).remove([file_path])
+        return True
+
+    def get_signed_url(self, bucket_name: str, file_path: str, expires_in: int = 3600) -> str:
+        response = self.client.storage.from_(bucket_name).create_signed_url(file_path, expires_in)
+        return response.get('signedURL', '')
+
+    def get_public_url(self, bucket_name: str, file_path: str) -> str:
+        return self.client.storage.from_(bucket_name).get_public_url(file_path)
+
+
+class LocalStorageBackend(StorageBackend):
+    """Yerel dosya sistemi backend'i
+
+    Dosyalar `root/bucket/path` altına atomik olarak (geçici dosya + rename)
+    yazılır ve /api/files endpoint'i üzerinden FileRangeResponse ile sunulur.
+    İmzalı URL'ler secret_key ile HMAC-SHA256 imzalanır.
+    """
+
+    def __init__(self, root: str, base_url: str, secret_key: str):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+        self.secret_key = secret_key.encode()
+
+    def resolve_path(self, bucket_name: str, file_path: str) -> str:
+        """Dosyanın disk yolunu döndür (kök dizin dışına çıkışı engeller)"""
+        full_path = os.path.abspath(os.path.join(self.root, bucket_name, file_path))
+        if not full_path.startswith(self.root + os.sep) or not bucket_name or "/" in bucket_name:
+            raise ValueError(f"Geçersiz dosya yolu: {bucket_name}/{file_path}")
+        return full_path
+
+    def upload(self, bucket_name: str, file_path: str, content: bytes, content_type: str, cache_control: str = "3600"):
+        full_path = self.resolve_path(bucket_name, file_path)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+
+        # Aynı dizinde geçici dosyaya yaz, sonra atomik olarak yerine taşı;
+        # okuyucular hiçbir zaman yarım yazılmış dosya görmez
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, full_path)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def delete(self, bucket_name: str, file_path: str) -> bool:
+        try:
+            os.remove(self.resolve_path(bucket_name, file_path))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def sign(self, bucket_name: str, file_path: str, expires: int) -> str:
+        """Dosya yolu ve son geçerlilik zamanı için imza üret"""
+        message = f"{bucket_name}/{file_path}:{expires}".encode()
+        return hmac.new(self.secret_key, message, hashlib.sha256).hexdigest()
+
+    def verify_signature(self, bucket_name: str, file_path: str, expires: int, signature: str) -> bool:
+        """İmzalı URL parametrelerini doğrula"""
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(self.sign(bucket_name, file_path, expires), signature)
+
+    def get_signed_url(self, bucket_name: str, file_path: str, expires_in: int = 3600) -> str:
+        expires = int(time.time()) + expires_in
+        signature = self.sign(bucket_name, file_path, expires)
+        return f"{self.get_public_url(bucket_name, file_path)}?expires={expires}&signature={signature}"
+
+    def get_public_url(self, bucket_name: str, file_path: str) -> str:
+        return f"{self.base_url}/{quote(bucket_name)}/{quote(file_path)}"
+
+
+class FaultInjectingBackend(StorageBackend):
+    """Başka bir backend'i saran, hata ve gecikme enjekte eden yük testi backend'i"""
+
+    def __init__(self, backend: StorageBackend, injector: FaultInjector):
+        self.backend = backend
+        self.injector = injector
+
+    def upload(self, bucket_name: str, file_path: str, content: bytes, content_type: str, cache_control: str = "3600"):
+        return self.injector.run(lambda: self.backend.upload(bucket_name, file_path, content, content_type, cache_control))
+
+    def delete(self, bucket_name: str, file_path: str) -> bool:
+        return self.injector.run(lambda: self.backend.delete(bucket_name, file_path))
+
+    def get_signed_url(self, bucket_name: str, file_path: str, expires_in: int = 3600) -> str:
+        return self.injector.run(lambda: self.backend.get_signed_url(bucket_name, file_path, expires_in))
+
+    def get_public_url(self, bucket_name: str, file_path: str) -> str:
+        return self.backend.get_public_url(bucket_name, file_path)
+
+    def __getattr__(self, name):
+        # resolve_path / verify_signature gibi backend'e özgü metodlar
+        return getattr(self.backend, name)
+
+
+def create_storage_backend() -> StorageBackend:
+    """Ayarlara göre depolama backend'ini oluştur"""
+    if settings.storage_backend == "local":
+        backend = LocalStorageBackend(
+            settings.local_storage_path,
+            settings.local_storage_base_url,
+            settings.secret_key
+        )
+    else:
+        backend = SupabaseStorageBackend()
+
+    if settings.storage_fault_error_rate > 0 or settings.storage_fault_stall_rate > 0 or settings.storage_fault_latency > 0:
+        print("⚠️ Storage fault injection aktif")
+        backend = FaultInjectingBackend(backend, FaultInjector(
+            error_rate=settings.storage_fault_error_rate,
+            latency=settings.storage_fault_latency,
+            stall_rate=settings.storage_fault_stall_rate
+        ))
+    return backend
+
+
+def parse_range(range_header: str, file_size: int) -> Optional[Tuple[int, int]]:
+    """Tek aralıklı `bytes=` Range başlığını (başlangıç, bitiş) olarak çöz
+
+    Çoklu aralık veya geçersiz sözdizimi için None döner (tam dosya gönderilir).
+    Karşılanamayan aralık için ValueError fırlatır (416).
+    """
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+
+    start_str, sep, end_str = ranges.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        start = int(start_str) if start_str.strip() else None
+        end = int(end_str) if end_str.strip() else None
+    except ValueError:
+        return None
+
+    if start is None:
+        # bytes=-N: son N bayt
+        if end is None:
+            return None
+        if end == 0 or file_size == 0:
+            raise ValueError("Karşılanamayan aralık")
+        return max(file_size - end, 0), file_size - 1
+
+    if end is None:
+        end = file_size - 1
+    if start >= file_size or start > end:
+        raise ValueError("Karşılanamayan aralık")
+    return start, min(end, file_size - 1)
+
+
+class FileRangeResponse(Response):
+    """Diskten dosya sunan, Range, ETag ve koşullu istekleri destekleyen yanıt
+
+    Dosya sabit boyutlu parçalar halinde okunup gönderilir; bellek kullanımı
+    dosya boyutundan bağımsızdır. Uvicorn dahil yaygın ASGI sunucuları
+    zero-copy desteklemez; yalnızca `http.response.zerocopysend` uzantısını
+    sunan sunucularda dosya tanımlayıcısı doğrudan sunucuya verilir.
+    """
+
+    chunk_size = 256 * 1024
+
+    def __init__(
+        self,
+        path: str,
+        stat_result: os.stat_result,
+        request_headers,
+        media_type: Optional[str] = None,
+        cache_control: str = "private, max-age=3600"
+    ):
+        self.path = path
+        self.background = None
+        self.media_type = media_type or mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.status_code = 200
+        self.offset = 0
+        self.count = stat_result.st_size
+
+        etag = f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+        headers = {
+            "accept-ranges": "bytes",
+            "etag": etag,
+            "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+            "cache-control": cache_control,
+        }
+
+        if self.is_not_modified(request_headers, etag, stat_result.st_mtime):
+            self.status_code = 304
+            self.count = 0
+        else:
+            range_header = request_headers.get("range")
+            if_range = request_headers.get("if-range")
+            if range_header and (if_range is None or if_range == etag):
+                try:
+                    byte_range = parse_range(range_header, stat_result.st_size)
+                except ValueError:
+                    self.status_code = 416
+                    self.count = 0
+                    headers["content-range"] = f"bytes */{stat_result.st_size}"
+                else:
+                    if byte_range is not None:
+                        start, end = byte_range
+                        self.status_code = 206
+                        self.offset = start
+                        self.count = end - start + 1
+                        headers["content-range"] = f"bytes {start}-{end}/{stat_result.st_size}"
+            headers["content-length"] = str(self.count)
+
+        self.init_headers(headers)
+
+    @staticmethod
+    def is_not_modified(request_headers, etag: str, mtime: float) -> bool:
+        """Koşullu istek başlıklarına göre 304 dönülmeli mi"""
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+
+        if scope.get("method") == "HEAD" or self.count == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f,
+                    "offset": self.offset,
+                    "count": self.count,
+                })
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as f:
+            await f.seek(self.offset)
+            remaining = self.count
+            while remaining > 0:
+                chunk = await f.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": remaining > 0,
+                })
+            if remaining > 0:
+                # Dosya okunurken kısaldı; yanıtı kapat
+                await send({"type": "http.response.body", "body": b""})
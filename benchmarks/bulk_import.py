@@ -0,0 +1,128 @@
+"""
+Toplu içe aktarma benchmark'ı
+
+Tek tek POST /api/verification yolunu (2 benzersizlik sorgusu + tek satırlık
+INSERT) toplu içe aktarıcıyla (parça başına 1 sorgu + 1 çok satırlı INSERT)
+satır/saniye olarak karşılaştırır. Supabase yerine her istekte sabit ağ
+gecikmesi ekleyen bellek içi bir taklit kullanılır.
+
+Kullanım:
+    python benchmarks/bulk_import.py [satır_sayısı] [gecikme_ms]
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+from config import SupabaseClient  # noqa: E402
+from models import VerificationCreate  # noqa: E402
+from importer import VerificationImporter  # noqa: E402
+
+
+class InMemorySupabase(SupabaseClient):
+    """Her çağrıda gecikme ekleyen bellek içi Supabase taklidi"""
+
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+        self.round_trips = 0
+        self.usernames = set()
+        self.emails = set()
+
+    async def round_trip(self):
+        self.round_trips += 1
+        await asyncio.sleep(self.latency)
+
+    async def check_username_exists(self, username: str) -> bool:
+        await self.round_trip()
+        return username in self.usernames
+
+    async def check_email_exists(self, email: str) -> bool:
+        await self.round_trip()
+        return email in self.emails
+
+    async def find_existing_identities(self, usernames, emails):
+        await self.round_trip()
+        return self.usernames & set(usernames), self.emails & set(emails)
+
+    async def insert_verifications(self, rows: List[dict]) -> int:
+        await self.round_trip()
+        for row in rows:
+            self.usernames.add(row["username"])
+            self.emails.add(row["email"])
+        return len(rows)
+
+
+def make_lines(count: int) -> List[str]:
+    """Örnek NDJSON satırları (%2 hatalı, %1 tekrar)"""
+    lines = []
+    for i in range(count):
+        row = {
+            "username": f"legacy_user_{i}",
+            "first_name": "Ayşe",
+            "last_name": "Yılmaz",
+            "email": f"user{i}@example.com",
+            "phone": "+905551234567",
+            "id_image_url": f"https://cdn.example.com/id/{i}.jpg",
+            "selfie_image_url": f"https://cdn.example.com/selfie/{i}.jpg",
+        }
+        if i % 50 == 49:
+            row["phone"] = "abc"
+        if i % 100 == 99:
+            row["username"] = "legacy_user_0"
+        lines.append(json.dumps(row, ensure_ascii=False))
+    return lines
+
+
+async def per_row(lines: List[str], supabase: InMemorySupabase) -> int:
+    """Eski yol: satır başına iki sorgu + tek satırlık INSERT"""
+    inserted = 0
+    for line in lines:
+        try:
+            data = json.loads(line)
+            form = VerificationCreate(**data)
+        except ValueError:
+            continue
+        if await supabase.check_username_exists(form.username):
+            continue
+        if await supabase.check_email_exists(form.email):
+            continue
+        inserted += await supabase.insert_verifications([{**data, **form.model_dump()}])
+    return inserted
+
+
+async def bulk(lines: List[str], supabase: InMemorySupabase, batch_size: int) -> int:
+    """Yeni yol: VerificationImporter"""
+    async def source():
+        for line in lines:
+            yield line.encode("utf-8")
+
+    result = await VerificationImporter(supabase, batch_size).run(source())
+    return result.inserted
+
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 5.0) / 1000
+    lines = make_lines(count)
+    print(f"{count} satır, istek başına {latency * 1000:.1f} ms gecikme\n")
+    print(f"{'yol':<22} {'eklenen':>8} {'istek':>7} {'süre s':>8} {'satır/s':>10}")
+
+    runs = [("tek tek", lambda db: per_row(lines, db))]
+    for batch_size in (100, 500, 1000):
+        runs.append((f"toplu (parça={batch_size})", lambda db, b=batch_size: bulk(lines, db, b)))
+
+    for name, run in runs:
+        supabase = InMemorySupabase(latency)
+        start = time.perf_counter()
+        inserted = await run(supabase)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<22} {inserted:>8} {supabase.round_trips:>7} {elapsed:>8.2f} {count / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+"""
+Görüntü kodlama politikaları benchmark'ı
+
+Örnek bir görüntü korpusu üzerinde her politika için toplam çıktı boyutunu ve
+kodlama CPU süresini ölçer, sabit quality=85 + optimize=True referansıyla
+karşılaştırır.
+
+Kullanım:
+    python benchmarks/image_encoding.py [korpus_klasörü]
+
+Klasör verilmezse sentetik (basit ve detaylı) görüntüler üretilir.
+"""
+import io
+import os
+import sys
+import time
+import random
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+from PIL import Image, ImageDraw  # noqa: E402
+from config import settings, available_image_formats  # noqa: E402
+from storage import StorageManager  # noqa: E402
+
+
+# (isim, ayar değişiklikleri)
+POLICIES = [
+    ("jpeg q85 optimize (eski)", {"image_output_format": "jpeg", "image_progressive": False, "image_target_bytes": 0}),
+    ("jpeg q85 progressive", {"image_output_format": "jpeg", "image_progressive": True, "image_target_bytes": 0}),
+    ("jpeg progressive <=250KB", {"image_output_format": "jpeg", "image_progressive": True, "image_target_bytes": 250 * 1024}),
+    ("webp q85", {"image_output_format": "webp", "image_target_bytes": 0}),
+    ("webp <=250KB", {"image_output_format": "webp", "image_target_bytes": 250 * 1024}),
+    ("avif q85", {"image_output_format": "avif", "image_target_bytes": 0}),
+]
+
+
+def synthetic_corpus(count: int = 8) -> List[Tuple[str, bytes]]:
+    """Basit (düz renkli) ve detaylı (gürültülü) örnek görüntüler üret"""
+    rng = random.Random(42)
+    corpus = []
+    for i in range(count):
+        width, height = (2400, 1600) if i % 2 else (1600, 1000)
+        if i % 2 == 0:
+            image = Image.new("RGB", (width, height), (230, 230, 225))
+            draw = ImageDraw.Draw(image)
+            for _ in range(40):
+                x, y = rng.randrange(width), rng.randrange(height)
+                draw.rectangle((x, y, x + 200, y + 40), fill=(rng.randrange(256), 40, 90))
+        else:
+            image = Image.effect_noise((width, height), 60).convert("RGB")
+        output = io.BytesIO()
+        image.save(output, format="PNG" if i % 4 == 0 else "JPEG", quality=95)
+        corpus.append((f"synthetic-{i}", output.getvalue()))
+    return corpus
+
+
+def load_corpus(folder: str) -> List[Tuple[str, bytes]]:
+    """Klasördeki jpg/png dosyalarını oku"""
+    corpus = []
+    for name in sorted(os.listdir(folder)):
+        if name.lower().rsplit(".", 1)[-1] in settings.allowed_extensions:
+            with open(os.path.join(folder, name), "rb") as f:
+                corpus.append((name, f.read()))
+    return corpus
+
+
+def run_policy(manager: StorageManager, corpus: List[Tuple[str, bytes]], overrides: dict) -> Tuple[int, float, str]:
+    """Politikayı uygula, (toplam bayt, CPU saniyesi, content-type) döndür"""
+    original = {key: getattr(settings, key) for key in overrides}
+    for key, value in overrides.items():
+        setattr(settings, key, value)
+    try:
+        total_bytes = 0
+        content_type = ""
+        start = time.process_time()
+        for _, content in corpus:
+            data, content_type, _ = manager.optimize_image(content)
+            total_bytes += len(data)
+        return total_bytes, time.process_time() - start, content_type or "-"
+    finally:
+        for key, value in original.items():
+            setattr(settings, key, value)
+
+
+def main():
+    corpus = load_corpus(sys.argv[1]) if len(sys.argv) > 1 else synthetic_corpus()
+    if not corpus:
+        print("Korpus boş")
+        return
+
+    manager = StorageManager()
+    input_bytes = sum(len(content) for _, content in corpus)
+    print(f"Korpus: {len(corpus)} görüntü, {input_bytes / 1024:.0f} KB\n")
+    print(f"{'politika':<28} {'content-type':<12} {'KB':>9} {'tasarruf':>9} {'CPU s':>8}")
+
+    baseline_bytes = None
+    for name, overrides in POLICIES:
+        if overrides["image_output_format"] not in available_image_formats():
+            # Kodlayıcı yoksa StorageManager JPEG'e düşer; yanıltıcı satır basma
+            print(f"{name:<28} (kodlayıcı bulunamadı, atlandı)")
+            continue
+        total_bytes, cpu, content_type = run_policy(manager, corpus, overrides)
+        if baseline_bytes is None:
+            baseline_bytes = total_bytes
+        saved = 100 * (baseline_bytes - total_bytes) / baseline_bytes
+        print(f"{name:<28} {content_type:<12} {total_bytes / 1024:>9.0f} {saved:>8.1f}% {cpu:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
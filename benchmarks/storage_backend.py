@@ -0,0 +1,102 @@
+"""
+Depolama backend benchmark'ı
+
+Yükleme hattını (validasyon + optimizasyon + backend'e yazma) yerel disk
+backend'i ile çevrimdışı ölçer; SUPABASE_URL tanımlıysa aynı hattı mevcut
+Supabase Storage yolu için de çalıştırır. Ardından /api/files üzerinden dosya
+sunumunu (tam dosya ve Range istekleri) belleğe okuyup gönderen düz bir
+Response ile karşılaştırır.
+
+Kullanım:
+    python benchmarks/storage_backend.py [yükleme_sayısı] [istek_sayısı]
+"""
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+import httpx  # noqa: E402
+from PIL import Image  # noqa: E402
+from starlette.applications import Starlette  # noqa: E402
+from starlette.datastructures import Headers, UploadFile  # noqa: E402
+from starlette.responses import Response  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+from config import settings  # noqa: E402
+from storage import StorageManager  # noqa: E402
+from storage_backends import LocalStorageBackend, SupabaseStorageBackend, FileRangeResponse  # noqa: E402
+
+
+def sample_image() -> bytes:
+    """Kamera çekimine benzer boyutta örnek JPEG"""
+    output = io.BytesIO()
+    Image.effect_noise((2400, 1600), 40).convert("RGB").save(output, format="JPEG", quality=92)
+    return output.getvalue()
+
+
+async def bench_uploads(name: str, manager: StorageManager, content: bytes, count: int):
+    """Yükleme hattını `count` kez çalıştır"""
+    start = time.perf_counter()
+    for i in range(count):
+        upload = UploadFile(
+            io.BytesIO(content), size=len(content), filename=f"bench-{i}.jpg",
+            headers=Headers({"content-type": "image/jpeg"})
+        )
+        await manager.upload_file(upload, settings.kyc_documents_bucket, "benchmark")
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} {count:>6} {elapsed:>8.2f} {count / elapsed:>10.1f}")
+
+
+async def bench_serving(path: str, requests: int):
+    """FileRangeResponse ile belleğe okuyup gönderen Response'u karşılaştır"""
+    async def file_range(request):
+        return FileRangeResponse(path, os.stat(path), request.headers)
+
+    async def in_memory(request):
+        with open(path, "rb") as f:
+            return Response(f.read(), media_type="image/jpeg")
+
+    app = Starlette(routes=[Route("/file", file_range), Route("/memory", in_memory)])
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, url, headers in [
+            ("bellekte tam dosya", "/memory", {}),
+            ("FileRangeResponse tam dosya", "/file", {}),
+            ("FileRangeResponse Range 64KB", "/file", {"Range": "bytes=0-65535"}),
+        ]:
+            start = time.perf_counter()
+            received = 0
+            for _ in range(requests):
+                response = await client.get(url, headers=headers)
+                received += len(response.content)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<28} {requests:>6} {elapsed:>8.2f} {requests / elapsed:>10.1f} {received / elapsed / 1e6:>8.1f}")
+
+
+async def main():
+    uploads = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    content = sample_image()
+
+    with tempfile.TemporaryDirectory() as root:
+        print(f"Yükleme ({len(content) / 1024:.0f} KB girdi)")
+        print(f"{'backend':<28} {'adet':>6} {'süre s':>8} {'adet/s':>10}")
+        local = LocalStorageBackend(root, "/api/files", settings.secret_key)
+        await bench_uploads("local", StorageManager(local), content, uploads)
+        if settings.supabase_url:
+            await bench_uploads("supabase", StorageManager(SupabaseStorageBackend()), content, uploads)
+        else:
+            print(f"{'supabase':<28} (SUPABASE_URL tanımlı değil, atlandı)")
+
+        local.upload("bench", "serve.jpg", content, "image/jpeg")
+        path = local.resolve_path("bench", "serve.jpg")
+        print(f"\nSunum ({len(content) / 1024:.0f} KB dosya)")
+        print(f"{'yanıt':<28} {'istek':>6} {'süre s':>8} {'istek/s':>10} {'MB/s':>8}")
+        await bench_serving(path, requests)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
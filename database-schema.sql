@@ -82,7 +82,114 @@ CREATE POLICY "Users can read own profile" ON admin_profiles
 DROP PUBLICATION IF EXISTS supabase_realtime;
 CREATE PUBLICATION supabase_realtime FOR ALL TABLES;
 
--- 10. Test verisi ekle (opsiyonel - silebilirsiniz)
+-- 10. İstatistik özet tabloları (trigger ile artımlı güncellenir)
+-- Admin paneli sayaçları ve günlük istatistikler tabloyu taramadan buradan okunur
+CREATE TABLE verification_status_counts (
+    status verification_status PRIMARY KEY,
+    count BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE verification_daily_stats (
+    day DATE PRIMARY KEY,
+    submitted INTEGER NOT NULL DEFAULT 0,
+    reviewed INTEGER NOT NULL DEFAULT 0,
+    approved INTEGER NOT NULL DEFAULT 0,
+    rejected INTEGER NOT NULL DEFAULT 0,
+    review_seconds_total DOUBLE PRECISION NOT NULL DEFAULT 0
+);
+
+-- Mevcut verilerden başlangıç değerlerini doldur (yalnızca kurulumda bir kez)
+INSERT INTO verification_status_counts (status, count)
+SELECT s.status, COUNT(v.id)
+FROM unnest(enum_range(NULL::verification_status)) AS s(status)
+LEFT JOIN verification_requests v ON v.status = s.status
+GROUP BY s.status;
+
+INSERT INTO verification_daily_stats (day, submitted)
+SELECT (created_at AT TIME ZONE 'UTC')::date, COUNT(*)
+FROM verification_requests
+GROUP BY 1;
+
+-- İncelenmiş kayıtlar: inceleme günü, sonuç sayıları ve toplam inceleme süresi
+INSERT INTO verification_daily_stats (day, reviewed, approved, rejected, review_seconds_total)
+SELECT
+    (COALESCE(reviewed_at, updated_at) AT TIME ZONE 'UTC')::date,
+    COUNT(*),
+    COUNT(*) FILTER (WHERE status = 'approved'),
+    COUNT(*) FILTER (WHERE status = 'rejected'),
+    COALESCE(SUM(EXTRACT(EPOCH FROM COALESCE(reviewed_at, updated_at) - created_at)), 0)
+FROM verification_requests
+WHERE status <> 'pending'
+GROUP BY 1
+ON CONFLICT (day) DO UPDATE SET
+    reviewed = EXCLUDED.reviewed,
+    approved = EXCLUDED.approved,
+    rejected = EXCLUDED.rejected,
+    review_seconds_total = EXCLUDED.review_seconds_total;
+
+CREATE OR REPLACE FUNCTION maintain_verification_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Durum sayaçları
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE verification_status_counts SET count = count - 1 WHERE status = OLD.status;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE verification_status_counts SET count = count + 1 WHERE status = NEW.status;
+    END IF;
+
+    -- Günlük başvuru sayısı
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO verification_daily_stats (day, submitted)
+        VALUES ((NEW.created_at AT TIME ZONE 'UTC')::date, 1)
+        ON CONFLICT (day) DO UPDATE
+            SET submitted = verification_daily_stats.submitted + 1;
+    END IF;
+
+    -- İlk inceleme (pending -> approved/rejected): günlük inceleme sayısı ve süresi
+    IF TG_OP = 'UPDATE' AND OLD.status = 'pending' AND NEW.status <> 'pending' THEN
+        INSERT INTO verification_daily_stats (day, reviewed, approved, rejected, review_seconds_total)
+        VALUES (
+            (COALESCE(NEW.reviewed_at, NOW()) AT TIME ZONE 'UTC')::date,
+            1,
+            (NEW.status = 'approved')::int,
+            (NEW.status = 'rejected')::int,
+            EXTRACT(EPOCH FROM COALESCE(NEW.reviewed_at, NOW()) - NEW.created_at)
+        )
+        ON CONFLICT (day) DO UPDATE SET
+            reviewed = verification_daily_stats.reviewed + 1,
+            approved = verification_daily_stats.approved + EXCLUDED.approved,
+            rejected = verification_daily_stats.rejected + EXCLUDED.rejected,
+            review_seconds_total = verification_daily_stats.review_seconds_total + EXCLUDED.review_seconds_total;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ language 'plpgsql' SECURITY DEFINER SET search_path = public;
+
+CREATE TRIGGER verification_stats_on_insert
+    AFTER INSERT ON verification_requests
+    FOR EACH ROW EXECUTE FUNCTION maintain_verification_stats();
+
+CREATE TRIGGER verification_stats_on_status_change
+    AFTER UPDATE OF status ON verification_requests
+    FOR EACH ROW WHEN (OLD.status IS DISTINCT FROM NEW.status)
+    EXECUTE FUNCTION maintain_verification_stats();
+
+CREATE TRIGGER verification_stats_on_delete
+    AFTER DELETE ON verification_requests
+    FOR EACH ROW EXECUTE FUNCTION maintain_verification_stats();
+
+ALTER TABLE verification_status_counts ENABLE ROW LEVEL SECURITY;
+ALTER TABLE verification_daily_stats ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Authenticated users can read" ON verification_status_counts
+    FOR SELECT USING (auth.role() = 'authenticated');
+
+CREATE POLICY "Authenticated users can read" ON verification_daily_stats
+    FOR SELECT USING (auth.role() = 'authenticated');
+
+-- 11. Test verisi ekle (opsiyonel - silebilirsiniz)
 -- INSERT INTO verification_requests (
 --     username, first_name, last_name, email, phone, 
 --     id_image_url, selfie_image_url
@@ -4,6 +4,7 @@ import LoadingSpinner from './LoadingSpinner'
 
 function AdminPanel() {
   const [verifications, setVerifications] = useState([])
+  const [stats, setStats] = useState(null)
   const [isLoading, setIsLoading] = useState(true)
   const [selectedVerification, setSelectedVerification] = useState(null)
   const [isAuthenticated, setIsAuthenticated] = useState(false)
@@ -14,6 +15,7 @@ function AdminPanel() {
     if (authToken === 'admin123') {
       setIsAuthenticated(true)
       fetchVerifications()
+      fetchStats()
     } else {
       alert('Geçersiz token!')
     }
@@ -40,6 +42,23 @@ function AdminPanel() {
     }
   }
 
+  // Sayaçları çek (özet tablodan, tüm listeyi çekmeden)
+  const fetchStats = async () => {
+    try {
+      const response = await fetch('/api/verifications/stats?days=7', {
+        headers: {
+          'Authorization': `Bearer ${authToken}`
+        }
+      })
+      
+      if (response.ok) {
+        setStats(await response.json())
+      }
+    } catch (error) {
+      console.error('İstatistikler yüklenemedi:', error)
+    }
+  }
+
   // Status güncelle
   const updateStatus = async (id, status) => {
     try {
@@ -57,6 +76,7 @@ function AdminPanel() {
       
       if (response.ok) {
         fetchVerifications()
+        fetchStats()
         setSelectedVerification(null)
       }
     } catch (error) {
@@ -98,18 +118,18 @@ function AdminPanel() {
         <h2>Admin Paneli</h2>
         <div className="admin-stats">
           <div className="stat">
-            <span className="stat-number">{verifications.length}</span>
+            <span className="stat-number">{stats ? stats.total : verifications.length}</span>
             <span className="stat-label">Toplam Başvuru</span>
           </div>
           <div className="stat">
             <span className="stat-number">
-              {verifications.filter(v => v.status === 'pending').length}
+              {stats ? stats.pending : verifications.filter(v => v.status === 'pending').length}
             </span>
             <span className="stat-label">Bekleyen</span>
           </div>
           <div className="stat">
             <span className="stat-number">
-              {verifications.filter(v => v.status === 'approved').length}
+              {stats ? stats.approved : verifications.filter(v => v.status === 'approved').length}
             </span>
             <span className="stat-label">Onaylanan</span>
           </div>
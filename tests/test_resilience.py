@@ -0,0 +1,146 @@
+"""
+Dayanıklılık katmanı testleri - geçici hata sınıflandırması ve circuit breaker
+
+Kullanım:
+    python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+from postgrest.exceptions import APIError  # noqa: E402
+from storage3.utils import StorageException  # noqa: E402
+from resilience import (  # noqa: E402
+    CircuitBreaker, CircuitOpenError, ResilientCaller, ServiceUnavailableError, is_transient
+)
+
+
+@pytest.mark.parametrize("exc", [
+    asyncio.TimeoutError(),
+    ConnectionError("reset"),
+    httpx.ConnectTimeout("timeout"),
+    StorageException({"statusCode": 503, "error": "Service Unavailable"}),
+    StorageException({"statusCode": "429", "error": "Too Many Requests"}),
+    APIError({"code": "PGRST000", "message": "Could not connect with the database"}),
+    APIError({"code": "PGRST003", "message": "Timed out acquiring connection from connection pool"}),
+    APIError({"code": "57014", "message": "canceling statement due to statement timeout"}),
+    APIError({"code": "08006", "message": "connection failure"}),
+    APIError({"code": "53300", "message": "too many connections"}),
+])
+def test_transient_errors(exc):
+    assert is_transient(exc)
+
+
+@pytest.mark.parametrize("exc", [
+    ValueError("bad input"),
+    StorageException({"statusCode": 404, "error": "Not Found"}),
+    StorageException({"statusCode": "409", "error": "Duplicate"}),
+    StorageException("plain message"),
+    APIError({"code": "23505", "message": "duplicate key value violates unique constraint"}),
+    APIError({"code": "PGRST116", "message": "JSON object requested, multiple rows returned"}),
+    APIError({"code": "42501", "message": "permission denied"}),
+])
+def test_non_transient_errors(exc):
+    assert not is_transient(exc)
+
+
+def test_breaker_opens_at_threshold():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_breaker_success_resets_failure_count():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_half_open_allows_single_probe():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_breaker_probe_success_closes():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_breaker_probe_failure_reopens():
+    breaker = CircuitBreaker("test", failure_threshold=5, reset_timeout=0.01)
+    for _ in range(5):
+        breaker.record_failure()
+    time.sleep(0.02)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker._state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_breaker_released_probe_can_be_retried():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    breaker.before_call()
+    breaker.release_probe()
+    breaker.before_call()
+
+
+def test_caller_retries_transient_errors_then_fails():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        raise ConnectionError("down")
+
+    caller = ResilientCaller("test", timeout=1, deadline=5, retries=2, backoff=0)
+    with pytest.raises(ServiceUnavailableError):
+        asyncio.run(caller.call(flaky))
+    assert len(calls) == 3
+    assert caller.breaker.failures == 1
+
+
+def test_caller_does_not_retry_non_idempotent_calls():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        raise ConnectionError("down")
+
+    caller = ResilientCaller("test", timeout=1, deadline=5, retries=2, backoff=0)
+    with pytest.raises(ServiceUnavailableError):
+        asyncio.run(caller.call(flaky, idempotent=False))
+    assert len(calls) == 1
+
+
+def test_caller_passes_through_non_transient_errors():
+    def conflict():
+        raise APIError({"code": "23505", "message": "duplicate key"})
+
+    caller = ResilientCaller("test", timeout=1, deadline=5, retries=2, backoff=0)
+    with pytest.raises(APIError):
+        asyncio.run(caller.call(conflict))
+    assert caller.breaker.failures == 0